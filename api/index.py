@@ -1,15 +1,32 @@
 # api/index.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.database import request_cache
+from app.core.async_database import close_async_client
+from app.services.queue_mirror import start_queue_mirror, stop_queue_mirror
+from app.services.queue_events import stop_hub
 from app.routes import auth, patients, medical_records, queue, patient_auth
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.QUEUE_MIRROR_ENABLED:
+        start_queue_mirror()
+    yield
+    await stop_hub()
+    stop_queue_mirror()
+    await close_async_client()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="PulseQ — Smart Hospital Queue & Medical Records System",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # ── CORS ───────────────────────────────────────────────────────────────────────
@@ -44,6 +61,16 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+
+# ── Per-request read cache ──────────────────────────────────────────────────────
+# Repeated get_ref(path).get() calls within one request share a single
+# round-trip; writes through get_ref() invalidate the affected paths.
+@app.middleware("http")
+async def request_cache_middleware(request: Request, call_next):
+    with request_cache():
+        return await call_next(request)
+
+
 app.include_router(auth.router)
 app.include_router(patients.router)
 app.include_router(medical_records.router)
@@ -0,0 +1,136 @@
+# app/core/async_database.py
+"""
+Async data access for route handlers.
+
+The firebase_admin client is blocking, so every call from a sync handler
+holds a threadpool worker for a full round-trip. This module talks to the
+Realtime Database REST API through one shared httpx.AsyncClient (HTTP/2,
+keep-alive pool), letting async handlers await reads and run independent
+ones concurrently with asyncio.gather().
+
+aget_ref(path) mirrors get_ref(path): it uses the same request-scoped read
+cache and, with DATABASE_BACKEND=local, the same in-process database.
+"""
+import asyncio
+import json as jsonlib
+import time
+from datetime import timezone
+from typing import Optional
+import httpx
+import firebase_admin
+from app.core.database import (
+    FIREBASE_DB_URL, current_request_cache, get_local_db, is_local_backend,
+)
+
+_client: Optional[httpx.AsyncClient] = None
+_token: Optional[str] = None
+_token_expiry: float = 0.0
+_token_lock = asyncio.Lock()
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=FIREBASE_DB_URL,
+            http2=True,
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_async_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _access_token() -> str:
+    """OAuth2 token from the firebase_admin app credential, refreshed before expiry."""
+    global _token, _token_expiry
+    async with _token_lock:
+        if _token is None or time.time() > _token_expiry - 60:
+            credential = firebase_admin.get_app().credential
+            info = await asyncio.to_thread(credential.get_access_token)
+            _token = info.access_token
+            # google-auth reports expiry as a naive UTC datetime
+            _token_expiry = (info.expiry.replace(tzinfo=timezone.utc).timestamp()
+                             if info.expiry else time.time() + 3000)
+        return _token
+
+
+class AsyncRef:
+    """Async counterpart of the object returned by get_ref()."""
+
+    def __init__(self, path: str):
+        self._path = path
+
+    async def _request(self, method: str, json=None, params=None):
+        if is_local_backend():
+            ref = get_local_db().reference(self._path)
+            if method == "GET":
+                return ref.get()
+            if method == "PUT":
+                return ref.set(json)
+            if method == "PATCH":
+                return ref.update(json)
+            return ref.delete()
+
+        token = await _access_token()
+        response = await _get_client().request(
+            method, f"/{self._path}.json", json=json, params=params,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        response.raise_for_status()
+        return response.json() if method == "GET" else None
+
+    async def get(self):
+        cache = current_request_cache()
+        if cache is not None:
+            hit, value = cache.lookup(self._path)
+            if hit:
+                return value
+        value = await self._request("GET")
+        if cache is not None:
+            cache.store(self._path, value)
+        return value
+
+    async def get_by_key(self, end_at: Optional[str] = None,
+                         limit_to_last: Optional[int] = None) -> dict:
+        """Children ordered by key, up to and including end_at, the last limit_to_last of them."""
+        if is_local_backend():
+            query = get_local_db().reference(self._path).order_by_key()
+            if end_at is not None:
+                query = query.end_at(end_at)
+            if limit_to_last is not None:
+                query = query.limit_to_last(limit_to_last)
+            return dict(query.get())
+        params = {"orderBy": jsonlib.dumps("$key")}
+        if end_at is not None:
+            params["endAt"] = jsonlib.dumps(end_at)
+        if limit_to_last is not None:
+            params["limitToLast"] = str(limit_to_last)
+        return await self._request("GET", params=params) or {}
+
+    def _invalidate(self):
+        cache = current_request_cache()
+        if cache is not None:
+            cache.invalidate(self._path)
+
+    async def set(self, value):
+        self._invalidate()
+        await self._request("PUT", value)
+
+    async def update(self, value: dict):
+        self._invalidate()
+        await self._request("PATCH", value)
+
+    async def delete(self):
+        self._invalidate()
+        await self._request("DELETE")
+
+
+def aget_ref(path: str) -> AsyncRef:
+    return AsyncRef(path.strip("/"))
@@ -10,6 +10,13 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     ALLOWED_ORIGINS: str = "*"
     FIREBASE_CREDENTIALS: str = ""
+    DATABASE_BACKEND: str = "firebase"   # "firebase" or "local"
+    LOCAL_DB_PATH: str = ""              # SQLite file for the local backend; empty = memory only
+    QUEUE_INDEX_TTL_SECONDS: float = 5.0
+    QUEUE_MIRROR_ENABLED: bool = False
+    QUEUE_MIRROR_MAX_STALENESS_SECONDS: float = 600.0
+    WAIT_MODEL_RELOAD_SECONDS: float = 60.0  # how often the coefficient table version is checked
+    QUEUE_PUSH_RESYNC_SECONDS: float = 15.0  # re-check of pushed queues for other workers' writes
 
     @property
     def allowed_origins_list(self) -> List[str]:
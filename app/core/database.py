@@ -1,8 +1,15 @@
 # app/core/database.py
 import os
 import json
+import copy
+import threading
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import Optional
 import firebase_admin
 from firebase_admin import credentials, db
+from app.core.config import settings
+from app.core.local_db import LocalDatabase
 
 FIREBASE_DB_URL = "https://pulseq-6dfd0-default-rtdb.firebaseio.com"
 
@@ -40,9 +47,170 @@ def init_firebase():
     })
 
 
+# ── Storage backend ────────────────────────────────────────────────────────────
+# DATABASE_BACKEND=firebase (default) talks to the live Realtime Database.
+# DATABASE_BACKEND=local uses the in-process emulator in app.core.local_db,
+# persisted to LOCAL_DB_PATH (SQLite) when that is set, so the API can be run,
+# load-tested and profiled offline.
+
+_local_db: Optional[LocalDatabase] = None
+# Set by isolated_local_db(); per context, like the request cache below
+_isolated_db: ContextVar[Optional[LocalDatabase]] = ContextVar("isolated_db", default=None)
+
+
+def get_local_db() -> LocalDatabase:
+    global _local_db
+    isolated = _isolated_db.get()
+    if isolated is not None:
+        return isolated
+    if _local_db is None:
+        _local_db = LocalDatabase(settings.LOCAL_DB_PATH)
+    return _local_db
+
+
+@contextmanager
+def isolated_local_db(database: LocalDatabase):
+    """
+    Run the block against database whatever DATABASE_BACKEND is set to
+    (replays and simulations), then restore the previous backend. Only the
+    current context sees it: threads started inside the block must run in a
+    copy of it (contextvars.copy_context()).
+    """
+    token = _isolated_db.set(database)
+    try:
+        yield database
+    finally:
+        _isolated_db.reset(token)
+
+
+def is_local_backend() -> bool:
+    return _isolated_db.get() is not None or settings.DATABASE_BACKEND == "local"
+
+
+def _reference(path: str):
+    if is_local_backend():
+        return get_local_db().reference(path)
+    return db.reference(path)
+
+
 # Initialize on import
-init_firebase()
+if not is_local_backend():
+    init_firebase()
+
+
+# ── Request-scoped read cache ──────────────────────────────────────────────────
+# Within one request every get() of a path is served from memory after the
+# first round-trip. Reads of a child of an already-fetched path are answered
+# from the cached parent. Writes made through get_ref() drop every cached
+# path that overlaps the written one.
+
+class RequestCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def lookup(self, path: str):
+        """Return (hit, value) for path, consulting cached ancestors too."""
+        with self._lock:
+            if path in self._values:
+                return True, copy.deepcopy(self._values[path])
+            parts = path.split("/") if path else []
+            for i in range(len(parts) - 1, -1, -1):
+                parent = "/".join(parts[:i])
+                if parent not in self._values:
+                    continue
+                node = self._values[parent]
+                for part in parts[i:]:
+                    if not isinstance(node, dict):
+                        node = None
+                        break
+                    node = node.get(part)
+                return True, copy.deepcopy(node)
+        return False, None
+
+    def store(self, path: str, value):
+        with self._lock:
+            self._values[path] = copy.deepcopy(value)
+
+    def invalidate(self, path: str):
+        with self._lock:
+            for cached in list(self._values):
+                if (not path or not cached or cached == path
+                        or cached.startswith(path + "/") or path.startswith(cached + "/")):
+                    del self._values[cached]
+
+
+_request_cache: ContextVar[Optional[RequestCache]] = ContextVar("request_cache", default=None)
+
+
+def current_request_cache() -> Optional[RequestCache]:
+    return _request_cache.get()
+
+
+def detached_context() -> Context:
+    """A copy of the current context without the request cache, for work that outlives the request."""
+    context = copy_context()
+    context.run(_request_cache.set, None)
+    return context
+
+
+@contextmanager
+def request_cache():
+    """Enable the read cache for everything run inside this block."""
+    token = _request_cache.set(RequestCache())
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+class CachedRef:
+    """Wraps a database reference; plain get() calls go through the request cache."""
+
+    def __init__(self, ref, path: str):
+        self._ref = ref
+        self._path = path
+
+    def get(self, *args, **kwargs):
+        cache = _request_cache.get()
+        if cache is None or args or kwargs:
+            return self._ref.get(*args, **kwargs)
+        hit, value = cache.lookup(self._path)
+        if hit:
+            return value
+        value = self._ref.get()
+        cache.store(self._path, value)
+        return value
+
+    def _invalidate(self):
+        cache = _request_cache.get()
+        if cache is not None:
+            cache.invalidate(self._path)
+
+    def set(self, value):
+        self._invalidate()
+        return self._ref.set(value)
+
+    def update(self, value):
+        self._invalidate()
+        return self._ref.update(value)
+
+    def delete(self):
+        self._invalidate()
+        return self._ref.delete()
+
+    def push(self, value=""):
+        self._invalidate()
+        return self._ref.push(value)
+
+    def transaction(self, transaction_update):
+        self._invalidate()
+        return self._ref.transaction(transaction_update)
+
+    def __getattr__(self, name):
+        # Queries (order_by_child, listen, ...) bypass the cache
+        return getattr(self._ref, name)
 
 
 def get_ref(path: str):
-    return db.reference(path)
\ No newline at end of file
+    return CachedRef(_reference(path), path.strip("/"))
\ No newline at end of file
@@ -0,0 +1,30 @@
+# app/core/etag.py
+"""
+Conditional JSON responses for endpoints clients poll.
+
+conditional_json() serialises the payload, tags it with a hash of the body
+and answers 304 Not Modified when the request's If-None-Match already
+carries that tag, so an unchanged queue status costs the client no body.
+"""
+import hashlib
+import json
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _matches(header: str, etag: str) -> bool:
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def conditional_json(request: Request, payload) -> Response:
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+    etag = _etag(body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,365 @@
+# app/core/local_db.py
+"""
+Local stand-in for the Firebase Realtime Database.
+
+Implements the subset of firebase_admin.db.Reference that the services use
+(get/set/update/delete/push/transaction, child(), shallow reads, ordered
+queries and listen() change streams) on an in-process JSON tree.
+Optionally every write is also persisted to a SQLite file, one row per leaf
+value, so data survives a restart. Selected with DATABASE_BACKEND=local (see app.core.database).
+"""
+import copy
+import hashlib
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def _split(path: str) -> List[str]:
+    return [p for p in (path or "").strip("/").split("/") if p]
+
+
+def _normalize(value):
+    """Mimic RTDB: empty containers and None children disappear."""
+    if isinstance(value, dict):
+        cleaned = {}
+        for k, v in value.items():
+            v = _normalize(v)
+            if v is not None:
+                cleaned[str(k)] = v
+        return cleaned or None
+    return value
+
+
+class LocalDatabase:
+    def __init__(self, sqlite_path: str = ""):
+        self._lock = threading.RLock()
+        self._root: Dict[str, Any] = {}
+        self._push_counter = itertools.count()
+        self.stats = {"reads": 0, "writes": 0}
+        self._listeners: List["LocalListenerRegistration"] = []
+        self._conn: Optional[sqlite3.Connection] = None
+        if sqlite_path:
+            self._open_sqlite(sqlite_path)
+
+    # ── SQLite persistence ─────────────────────────────────────────────────
+    def _open_sqlite(self, sqlite_path: str):
+        self._conn = sqlite3.connect(sqlite_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS nodes (path TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        for path, value in self._conn.execute("SELECT path, value FROM nodes"):
+            self._write_memory(_split(path), json.loads(value))
+
+    def _persist(self, parts: List[str], value):
+        if self._conn is None:
+            return
+        path = "/".join(parts)
+        rows = []
+        _flatten(parts, value, rows)
+        with self._conn:
+            # Drop ancestors that were leaves and the old subtree at path
+            for i in range(1, len(parts)):
+                self._conn.execute("DELETE FROM nodes WHERE path = ?", ("/".join(parts[:i]),))
+            if path:
+                self._conn.execute(
+                    "DELETE FROM nodes WHERE path = ? OR (path >= ? AND path < ?)",
+                    (path, path + "/", path + "0"),
+                )
+            else:
+                self._conn.execute("DELETE FROM nodes")
+            self._conn.executemany("INSERT INTO nodes (path, value) VALUES (?, ?)", rows)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ── Tree access ────────────────────────────────────────────────────────
+    def read(self, parts: List[str]):
+        with self._lock:
+            self.stats["reads"] += 1
+            node = self._root
+            for part in parts:
+                if not isinstance(node, dict) or part not in node:
+                    return None
+                node = node[part]
+            return copy.deepcopy(node)
+
+    def _write_memory(self, parts: List[str], value):
+        if not parts:
+            self._root = value if isinstance(value, dict) else {}
+            return
+        chain = [self._root]
+        node = self._root
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = {}
+                node[part] = child
+            node = child
+            chain.append(node)
+        if value is None:
+            node.pop(parts[-1], None)
+            # Prune parents left empty, as RTDB does
+            for i in range(len(parts) - 1, 0, -1):
+                if chain[i]:
+                    break
+                chain[i - 1].pop(parts[i - 1], None)
+        else:
+            node[parts[-1]] = value
+
+    def write(self, parts: List[str], value, notify: bool = True):
+        value = _normalize(copy.deepcopy(value))
+        with self._lock:
+            self.stats["writes"] += 1
+            self._write_memory(parts, value)
+            self._persist(parts, value)
+            if notify:
+                self._notify_put(parts, value)
+
+    def write_many(self, base: List[str], values: Dict[str, Any]):
+        with self._lock:
+            for key, value in values.items():
+                self.write(base + _split(key), value, notify=False)
+            self._notify_patch(base, values)
+
+    # ── Change streams ─────────────────────────────────────────────────────
+    def listen(self, parts: List[str], callback: Callable[["LocalEvent"], None]):
+        with self._lock:
+            registration = LocalListenerRegistration(self, parts, callback)
+            self._listeners.append(registration)
+            callback(LocalEvent("put", "/", self.read(parts)))
+            return registration
+
+    def _unlisten(self, registration: "LocalListenerRegistration"):
+        with self._lock:
+            if registration in self._listeners:
+                self._listeners.remove(registration)
+
+    def _notify_put(self, parts: List[str], value):
+        for listener in list(self._listeners):
+            base = listener.parts
+            if parts[:len(base)] == base:
+                rel = "/" + "/".join(parts[len(base):])
+                listener.callback(LocalEvent("put", rel, copy.deepcopy(value)))
+            elif base[:len(parts)] == parts:
+                # An ancestor was overwritten: resend the whole subtree
+                listener.callback(LocalEvent("put", "/", self.read(base)))
+
+    def _notify_patch(self, parts: List[str], values: Dict[str, Any]):
+        for listener in list(self._listeners):
+            base = listener.parts
+            if parts[:len(base)] == base:
+                rel = "/" + "/".join(parts[len(base):])
+                listener.callback(LocalEvent("patch", rel, copy.deepcopy(values)))
+                continue
+            if base[:len(parts)] != parts:
+                continue
+            # Multi-path update above the listener: forward only the keys under it
+            relevant = {}
+            for key, value in values.items():
+                key_parts = parts + _split(key)
+                if key_parts[:len(base)] == base and len(key_parts) > len(base):
+                    relevant["/".join(key_parts[len(base):])] = copy.deepcopy(value)
+                elif base[:len(key_parts)] == key_parts:
+                    relevant = None
+                    break
+            if relevant is None:
+                listener.callback(LocalEvent("put", "/", self.read(base)))
+            elif relevant:
+                listener.callback(LocalEvent("patch", "/", relevant))
+
+    def transaction(self, parts: List[str], update: Callable[[Any], Any]):
+        with self._lock:
+            new_value = update(self.read(parts))
+            if new_value is None:
+                # firebase_admin refuses to commit None from a transaction, so must we
+                raise ValueError("Value must not be none")
+            self.write(parts, new_value)
+            return new_value
+
+    def next_push_key(self) -> str:
+        return f"{time.time_ns():x}{next(self._push_counter):06x}"
+
+    def reference(self, path: str = "/") -> "LocalReference":
+        return LocalReference(self, _split(path))
+
+
+class LocalEvent:
+    """Same shape as firebase_admin.db.Event."""
+
+    def __init__(self, event_type: str, path: str, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class LocalListenerRegistration:
+    def __init__(self, database: LocalDatabase, parts: List[str], callback):
+        self._db = database
+        self.parts = parts
+        self.callback = callback
+        self.active = True
+
+    def close(self):
+        self.active = False
+        self._db._unlisten(self)
+
+
+def _flatten(parts: List[str], value, rows: List[Tuple[str, str]]):
+    if value is None:
+        return
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(parts + [k], v, rows)
+    else:
+        rows.append(("/".join(parts), json.dumps(value)))
+
+
+class LocalReference:
+    def __init__(self, database: LocalDatabase, parts: List[str]):
+        self._db = database
+        self._parts = parts
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self) -> str:
+        return "/" + "/".join(self._parts)
+
+    @property
+    def parent(self) -> Optional["LocalReference"]:
+        if not self._parts:
+            return None
+        return LocalReference(self._db, self._parts[:-1])
+
+    def child(self, path: str) -> "LocalReference":
+        return LocalReference(self._db, self._parts + _split(path))
+
+    def get(self, etag: bool = False, shallow: bool = False):
+        value = self._db.read(self._parts)
+        if shallow and isinstance(value, dict):
+            value = {k: True for k in value}
+        if etag:
+            tag = hashlib.md5(json.dumps(value, sort_keys=True).encode()).hexdigest()
+            return value, tag
+        return value
+
+    def set(self, value):
+        self._db.write(self._parts, value)
+
+    def update(self, value: dict):
+        if not value:
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        self._db.write_many(self._parts, value)
+
+    def delete(self):
+        self._db.write(self._parts, None)
+
+    def push(self, value="") -> "LocalReference":
+        ref = self.child(self._db.next_push_key())
+        if value != "":
+            ref.set(value)
+        return ref
+
+    def transaction(self, transaction_update: Callable[[Any], Any]):
+        return self._db.transaction(self._parts, transaction_update)
+
+    def listen(self, callback: Callable[[LocalEvent], None]) -> LocalListenerRegistration:
+        return self._db.listen(self._parts, callback)
+
+    # ── Queries ────────────────────────────────────────────────────────────
+    def order_by_child(self, path: str) -> "LocalQuery":
+        return LocalQuery(self, "child", _split(path))
+
+    def order_by_key(self) -> "LocalQuery":
+        return LocalQuery(self, "key")
+
+    def order_by_value(self) -> "LocalQuery":
+        return LocalQuery(self, "value")
+
+
+class LocalQuery:
+    def __init__(self, ref: LocalReference, order: str, child: Optional[List[str]] = None):
+        self._ref = ref
+        self._order = order
+        self._child = child or []
+        self._start = self._end = self._equal = None
+        self._first: Optional[int] = None
+        self._last: Optional[int] = None
+
+    def start_at(self, start):
+        self._start = start
+        return self
+
+    def end_at(self, end):
+        self._end = end
+        return self
+
+    def equal_to(self, value):
+        self._equal = value
+        return self
+
+    def limit_to_first(self, limit: int):
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit: int):
+        self._last = limit
+        return self
+
+    def _sort_value(self, key: str, value):
+        if self._order == "key":
+            return key
+        if self._order == "value":
+            return value
+        node = value
+        for part in self._child:
+            node = node.get(part) if isinstance(node, dict) else None
+        return node
+
+    def get(self) -> "OrderedDict[str, Any]":
+        data = self._ref.get()
+        if not isinstance(data, dict):
+            return OrderedDict()
+        items = [(k, v, self._sort_value(k, v)) for k, v in data.items()]
+        if self._equal is not None:
+            items = [i for i in items if i[2] == self._equal]
+        # Bounds compare in the sort order, so values of other types fall in or out by type
+        if self._start is not None:
+            items = [i for i in items if _position(i[2]) >= _position(self._start)]
+        if self._end is not None:
+            items = [i for i in items if _position(i[2]) <= _position(self._end)]
+        items.sort(key=lambda i: (_position(i[2]), i[0]))
+        if self._first is not None:
+            items = items[:self._first]
+        if self._last is not None:
+            items = items[-self._last:] if self._last else []
+        return OrderedDict((k, v) for k, v, _ in items)
+
+
+def _position(value):
+    # RTDB orders null first, then by value (ties are broken by key)
+    return value is not None, _rank(value)
+
+
+def _rank(value):
+    # False < True < numbers < strings < objects, like RTDB
+    if isinstance(value, bool):
+        return (0, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, 0) if value is None else (3, json.dumps(value, sort_keys=True))
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, status
-from app.core.database import get_ref
-from app.schemas.auth import LoginRequest, RegisterDoctorRequest, Token
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, status
+from typing import Optional
+from app.core.security import verify_token_header
+from app.schemas.auth import LoginRequest, RegisterDoctorRequest, DoctorProfileUpdate, Token
 from app.services.auth_service import (
     authenticate_doctor,
     register_doctor,
     create_token_for_doctor,
+    update_doctor_profile,
 )
+from app.services import name_snapshots
+from app.services.account_index import AccountExistsError
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -48,27 +52,38 @@ def login(request: LoginRequest):
 
 @router.post("/register", response_model=Token, status_code=201)
 def register(request: RegisterDoctorRequest):
-    doctors_ref = get_ref("doctors")
-    doctors = doctors_ref.get() or {}
-
-    # Check duplicate email or phone
-    for doc_id, doctor in doctors.items():
-        if doctor.get("email") == request.email:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        if doctor.get("phone") == request.phone:
-            raise HTTPException(status_code=400, detail="Phone already registered")
-
-    doctor = register_doctor(
-        name=request.name,
-        email=request.email,
-        phone=request.phone,
-        specialization=request.specialization,
-        hospital=request.hospital,
-        password=request.password,
-    )
+    try:
+        doctor = register_doctor(
+            name=request.name,
+            email=request.email,
+            phone=request.phone,
+            specialization=request.specialization,
+            hospital=request.hospital,
+            password=request.password,
+        )
+    except AccountExistsError as e:
+        raise HTTPException(status_code=400, detail=f"{e.field.capitalize()} already registered")
 
     return Token(
         access_token=create_token_for_doctor(doctor["id"]),
         token_type="bearer",
         doctor=_doctor_to_dict(doctor),
-    )
\ No newline at end of file
+    )
+
+
+@router.patch("/me")
+def update_profile(
+    data: DoctorProfileUpdate,
+    background_tasks: BackgroundTasks,
+    authorization: Optional[str] = Header(None),
+):
+    doctor_id = verify_token_header(authorization)
+    if not doctor_id:
+        raise HTTPException(status_code=401, detail="Invalid or missing token")
+    changes = data.model_dump()
+    doctor = update_doctor_profile(doctor_id, **changes)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    if name_snapshots.affects_snapshots("doctors", changes):
+        background_tasks.add_task(name_snapshots.fan_out, "doctors", doctor_id)
+    return {"success": True, "doctor": _doctor_to_dict(doctor)}
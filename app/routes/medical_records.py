@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
 from typing import Optional
 from app.core.security import verify_token_header
 from app.schemas.medical_record import (
@@ -6,9 +7,10 @@ from app.schemas.medical_record import (
     MedicalRecordResponse, MedicalRecordsListResponse
 )
 from app.services.medical_record_service import (
-    get_medical_records, create_medical_record, update_medical_record
+    create_medical_record, update_medical_record
 )
-from app.services.patient_service import get_patient_by_id, has_doctor_access
+from app.services.patient_service import get_patient_by_id
+from app.services import async_patient_service, async_medical_record_service
 
 router = APIRouter(prefix="/medical-records", tags=["Medical Records"])
 
@@ -19,16 +21,28 @@ def get_doctor_id(authorization: Optional[str] = Header(None)) -> str:
     return doctor_id
 
 @router.get("/patient/{patient_id}", response_model=MedicalRecordsListResponse)
-def list_records(patient_id: str, doctor_id: str = Depends(get_doctor_id)):
-    patient = get_patient_by_id(patient_id)
+async def list_records(
+    patient_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    after: Optional[str] = None,
+    doctor_id: str = Depends(get_doctor_id),
+):
+    # Records are only read once the access check has passed
+    patient, has_access = await asyncio.gather(
+        async_patient_service.get_patient_by_id(patient_id),
+        async_patient_service.has_doctor_access(doctor_id, patient_id),
+    )
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
-    if not has_doctor_access(doctor_id, patient_id):
+    if not has_access:
         raise HTTPException(status_code=403, detail="No access to this patient's records")
-    records = get_medical_records(patient_id, doctor_id)
+    records, next_cursor = await async_medical_record_service.get_patient_records(
+        patient_id, limit, after)
+    for record in records:
+        record["patient_name"] = patient["name"]
     return MedicalRecordsListResponse(
         success=True, count=len(records),
-        patient_name=patient["name"], records=records,
+        patient_name=patient["name"], records=records, next_cursor=next_cursor,
     )
 
 @router.post("/", response_model=MedicalRecordResponse, status_code=201)
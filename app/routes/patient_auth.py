@@ -1,8 +1,18 @@
 # app/routes/patient_auth.py
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Header, Query, Request
 from typing import Optional, List
 from pydantic import BaseModel
 from app.core.database import get_ref
+from app.core.async_database import aget_ref
+from app.services import queue_repository, account_index, name_snapshots
+from app.services.loader import load_many, aload_many
+from app.services.async_medical_record_service import get_patient_and_records
+from app.services.projection import (
+    DOCTOR_CONTACT_FIELDS, DOCTOR_LIST_FIELDS, parse_fields, project,
+)
+from app.schemas.patient import PatientProfileUpdate
+from app.services.patient_service import update_patient_profile
+from app.core.etag import conditional_json
 from app.core.security import create_access_token, verify_token_header, verify_password
 
 router = APIRouter(prefix="/patient-auth", tags=["Patient Auth"])
@@ -39,15 +49,12 @@ def patient_login(request: PatientLoginRequest):
     if not request.phone and not request.email:
         raise HTTPException(status_code=400, detail="Provide email or phone")
 
-    all_patients = get_ref("patients").get() or {}
-    for patient_id, patient in all_patients.items():
-        if not patient.get("is_active", True):
+    for field, value in (("email", request.email), ("phone", request.phone)):
+        patient_id = account_index.lookup("patients", field, value)
+        if not patient_id:
             continue
-        match = (
-            (request.email and patient.get("email") == request.email) or
-            (request.phone and patient.get("phone") == request.phone)
-        )
-        if match:
+        patient = get_ref(f"patients/{patient_id}").get()
+        if patient and patient.get("is_active", True):
             hashed = patient.get("hashed_password")
             if not hashed or not verify_password(request.password, hashed):
                 raise HTTPException(status_code=401, detail="Incorrect password")
@@ -66,88 +73,109 @@ def patient_login(request: PatientLoginRequest):
 
 
 @router.get("/me")
-def get_profile(authorization: Optional[str] = Header(None)):
+async def get_profile(authorization: Optional[str] = Header(None)):
+    patient_id = verify_token_header(authorization)
+    if not patient_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    patient = await aget_ref(f"patients/{patient_id}").get()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return _patient_to_dict(patient_id, patient)
+
+
+@router.patch("/me")
+def update_profile(
+    data: PatientProfileUpdate,
+    background_tasks: BackgroundTasks,
+    authorization: Optional[str] = Header(None),
+):
     patient_id = verify_token_header(authorization)
     if not patient_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    patient = get_ref(f"patients/{patient_id}").get()
+    changes = data.model_dump()
+    patient = update_patient_profile(patient_id, **changes)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
+    if name_snapshots.affects_snapshots("patients", changes):
+        background_tasks.add_task(name_snapshots.fan_out, "patients", patient_id)
     return _patient_to_dict(patient_id, patient)
 
 
+def _doctor_fields(fields: Optional[str], allowed) -> Optional[tuple]:
+    try:
+        return parse_fields(fields, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _read_fields(fields: Optional[tuple]) -> Optional[tuple]:
+    # Per-field reads only pay off for a narrowed projection; otherwise
+    # one whole-object read per doctor
+    return None if fields is None else fields + ("is_active",)
+
+
 @router.get("/my-doctors")
-def get_my_doctors(authorization: Optional[str] = Header(None)):
+async def get_my_doctors(fields: Optional[str] = None,
+                         authorization: Optional[str] = Header(None)):
     patient_id = verify_token_header(authorization)
     if not patient_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
+    fields = _doctor_fields(fields, DOCTOR_CONTACT_FIELDS)
 
-    all_links = get_ref("doctor_patient").get() or {}
-    doctor_ids = [
-        link["doctor_id"]
-        for link in all_links.values()
-        if link.get("patient_id") == patient_id
-    ]
+    doctor_ids = list(await aget_ref(f"patient_doctors/{patient_id}").get() or {})
 
+    loaded = await aload_many("doctors", doctor_ids, _read_fields(fields))
     doctors = []
-    for doc_id in doctor_ids:
-        doc = get_ref(f"doctors/{doc_id}").get()
+    for doc_id in dict.fromkeys(doctor_ids):
+        doc = loaded.get(doc_id)
         if doc and doc.get("is_active", True):
-            doctors.append({
-                "id": doc_id,
-                "name": doc.get("name", ""),
-                "specialization": doc.get("specialization", ""),
-                "hospital": doc.get("hospital", ""),
-                "phone": doc.get("phone", ""),
-                "email": doc.get("email", ""),
-            })
+            doctors.append(project(doc_id, doc, fields or DOCTOR_CONTACT_FIELDS))
 
     return {"doctors": doctors}
 
 
 @router.get("/doctors")
-def get_all_doctors(authorization: Optional[str] = Header(None)):
+def get_all_doctors(fields: Optional[str] = None,
+                    authorization: Optional[str] = Header(None)):
     patient_id = verify_token_header(authorization)
     if not patient_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    all_doctors = get_ref("doctors").get() or {}
+    fields = _doctor_fields(fields, DOCTOR_LIST_FIELDS)
+    # Shallow read for the ids, then each doctor (only the requested fields, if any)
+    doctor_ids = list(get_ref("doctors").get(shallow=True) or {})
+    loaded = load_many("doctors", doctor_ids, _read_fields(fields))
     return {
         "doctors": [
-            {
-                "id": doc_id,
-                "name": doc.get("name", ""),
-                "specialization": doc.get("specialization", ""),
-                "hospital": doc.get("hospital", ""),
-            }
-            for doc_id, doc in all_doctors.items()
-            if doc.get("is_active", True)
+            project(doc_id, doc, fields or DOCTOR_LIST_FIELDS)
+            for doc_id, doc in loaded.items()
+            if doc and doc.get("is_active", True)
         ]
     }
 
 
 @router.get("/my-records")
-def get_my_records(authorization: Optional[str] = Header(None)):
+async def get_my_records(
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    after: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+):
     patient_id = verify_token_header(authorization)
     if not patient_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    patient = get_ref(f"patients/{patient_id}").get()
+    patient, (own_records, next_cursor) = await get_patient_and_records(patient_id, limit, after)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
-    all_records = get_ref("medical_records").get() or {}
     records = []
-    for rec_id, record in all_records.items():
-        if record.get("patient_id") != patient_id:
-            continue
-        doc = get_ref(f"doctors/{record.get('doctor_id', '')}").get() or {}
+    for record in own_records:
         records.append({
-            "id": rec_id,
+            "id": record["id"],
             "patient_id": patient_id,
             "patient_name": patient.get("name", ""),
             "doctor_id": record.get("doctor_id", ""),
-            "doctor_name": doc.get("name", ""),
-            "doctor_specialization": doc.get("specialization", ""),
+            "doctor_name": record.get("doctor_name", ""),
+            "doctor_specialization": record.get("doctor_specialization", ""),
             "diagnosis": record.get("diagnosis", ""),
             "visit_date": record.get("visit_date", ""),
             "symptoms": record.get("symptoms", []),
@@ -157,12 +185,12 @@ def get_my_records(authorization: Optional[str] = Header(None)):
             "vital_signs": record.get("vital_signs"),
         })
 
-    records.sort(key=lambda x: x.get("visit_date", ""), reverse=True)
     return {
         "success": True,
         "count": len(records),
         "patient_name": patient.get("name", ""),
         "records": records,
+        "next_cursor": next_cursor,
     }
 
 
@@ -187,18 +215,19 @@ def book_token_patient(
     result = book_token(patient_id, doctor_id)
     entry = result["entry"]
     prediction = result["ai_prediction"]
-    doctor = get_ref(f"doctors/{doctor_id}").get() or {}
-    patient = get_ref(f"patients/{patient_id}").get() or {}
 
     # Save user-selected appointment time if provided
     if appointment_time:
+        gone = False
         try:
-            get_ref(f"queue_entries/{entry['id']}").update(
-                {"appointment_time": appointment_time}
-            )
+            gone = queue_repository.update_entry(
+                entry, {"appointment_time": appointment_time}
+            ) is None
             entry["appointment_time"] = appointment_time
         except Exception:
             pass
+        if gone:
+            raise HTTPException(status_code=409, detail="Booking was cancelled meanwhile")
 
     # Queue-based wait time: patients_ahead × 15 min
     patients_ahead = prediction.get("patients_ahead", 0)
@@ -210,9 +239,9 @@ def book_token_patient(
         "message": "Token booked successfully",
         "token_number": entry["token_number"],
         "booking_type": "token",
-        "patient_name": patient.get("name", ""),
-        "doctor_name": doctor.get("name", ""),
-        "doctor_specialization": doctor.get("specialization", ""),
+        "patient_name": entry["patient_name"],
+        "doctor_name": entry["doctor_name"],
+        "doctor_specialization": entry["doctor_specialization"],
         # Return the user-selected time unchanged
         "appointment_time": appointment_time,
         "status": entry["status"],
@@ -261,7 +290,7 @@ def book_multi_token_patient(
 
 
 @router.get("/my-queue")
-def my_queue(authorization: Optional[str] = Header(None)):
+def my_queue(request: Request, authorization: Optional[str] = Header(None)):
     patient_id = verify_token_header(authorization)
     if not patient_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -269,25 +298,26 @@ def my_queue(authorization: Optional[str] = Header(None)):
     from app.services.queue_service import (
         get_all_active_queue_for_patient,
         get_current_serving_token,
-        calculate_position,
-        ai_predict_wait_time,
+        predict_entries,
     )
 
     entries = get_all_active_queue_for_patient(patient_id)
     if not entries:
         return {"has_active_queue": False, "appointments": []}
 
+    name_snapshots.fill_missing(entries)
+    # One prediction pass per doctor queue; positions come from the same pass
+    predictions = predict_entries(entries)
+    serving = {d: get_current_serving_token(d) for d in {e["doctor_id"] for e in entries}}
     appointments = []
-    for entry in entries:
+    for entry, raw in zip(entries, predictions):
         booking_type = entry.get("booking_type", "token")
-        doctor = get_ref(f"doctors/{entry['doctor_id']}").get() or {}
-        position = calculate_position(entry)
-        patients_ahead = position - 1
+        patients_ahead = raw["patients_ahead"]
+        position = patients_ahead + 1
         queue_wait_mins = patients_ahead * 15
 
         ai_pred = None
         if booking_type == "token":
-            raw = ai_predict_wait_time(entry)
             ai_pred = {
                 "estimated_minutes": queue_wait_mins,  # queue-based
                 "estimated_time": raw["estimated_time"],
@@ -300,9 +330,9 @@ def my_queue(authorization: Optional[str] = Header(None)):
         appointments.append({
             "entry_id": entry.get("id", ""),
             "token_number": entry["token_number"],
-            "doctor_name": doctor.get("name", ""),
-            "doctor_specialization": doctor.get("specialization", ""),
-            "current_serving_token": get_current_serving_token(entry["doctor_id"]),
+            "doctor_name": entry["doctor_name"],
+            "doctor_specialization": entry["doctor_specialization"],
+            "current_serving_token": serving[entry["doctor_id"]],
             "position_in_queue": position,
             "status": entry["status"],
             "booking_type": booking_type,
@@ -313,7 +343,7 @@ def my_queue(authorization: Optional[str] = Header(None)):
             "estimated_wait_time": ai_pred,
         })
 
-    return {"has_active_queue": True, "appointments": appointments}
+    return conditional_json(request, {"has_active_queue": True, "appointments": appointments})
 
 
 @router.delete("/cancel")
@@ -325,7 +355,7 @@ def cancel_booking(
     if not patient_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    from app.services.queue_service import get_all_active_queue_for_patient
+    from app.services.queue_service import get_all_active_queue_for_patient, timestamp
 
     entries = get_all_active_queue_for_patient(patient_id)
     if not entries:
@@ -352,10 +382,9 @@ def cancel_booking(
         )
 
     try:
-        queue_ref = get_ref(f"queue_entries/{entry_to_cancel['id']}")
-        queue_ref.update({
+        queue_repository.archive_entry(entry_to_cancel, {
             "status": "cancelled",
-            "cancelled_at": __import__("datetime").datetime.utcnow().isoformat()
+            "cancelled_at": timestamp(),
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to cancel: {str(e)}")
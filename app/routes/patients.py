@@ -1,12 +1,15 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Header, Query
-from typing import Optional
+from fastapi.responses import JSONResponse
+from typing import Optional, Tuple
 from app.core.security import verify_token_header
 from app.schemas.patient import PatientResponse, PatientSearchResponse, PatientCreate
-from app.core.database import get_ref
 from app.services.patient_service import (
-    search_patients, get_patient_by_id, has_doctor_access,
-    create_patient, link_doctor_to_patient, get_all_doctor_patients
+    search_patients, get_patient_by_id,
+    create_patient, link_doctor_to_patient,
 )
+from app.services import async_patient_service
+from app.services.account_index import AccountExistsError
+from app.services.projection import PATIENT_FIELDS, parse_fields, project
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
 
@@ -16,39 +19,61 @@ def get_doctor_id(authorization: Optional[str] = Header(None)) -> str:
         raise HTTPException(status_code=401, detail="Invalid or missing token")
     return doctor_id
 
+def get_fields(fields: Optional[str] = Query(None, description="Comma-separated patient fields to return")):
+    try:
+        return parse_fields(fields, PATIENT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _search_response(patients, fields: Optional[Tuple[str, ...]]):
+    if fields is None:
+        return PatientSearchResponse(success=True, count=len(patients), patients=patients)
+    # A projection does not fit PatientResponse, so it skips response_model
+    return JSONResponse({
+        "success": True, "count": len(patients),
+        "patients": [project(p["id"], p, fields) for p in patients],
+    })
+
 @router.get("/search", response_model=PatientSearchResponse)
 def search(
     query: str = Query(..., min_length=1),
     search_type: str = Query("name"),
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields),
     doctor_id: str = Depends(get_doctor_id),
 ):
-    patients = search_patients(query, search_type, doctor_id)
-    return PatientSearchResponse(success=True, count=len(patients), patients=patients)
+    patients = search_patients(query, search_type, doctor_id, fields)
+    return _search_response(patients, fields)
 
 @router.get("/my-patients", response_model=PatientSearchResponse)
-def my_patients(doctor_id: str = Depends(get_doctor_id)):
-    patients = get_all_doctor_patients(doctor_id)
-    return PatientSearchResponse(success=True, count=len(patients), patients=patients)
+async def my_patients(
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields),
+    doctor_id: str = Depends(get_doctor_id),
+):
+    patients = await async_patient_service.get_all_doctor_patients(doctor_id, fields)
+    return _search_response(patients, fields)
 
 @router.post("/", response_model=PatientResponse, status_code=201)
 def add_patient(data: PatientCreate, doctor_id: str = Depends(get_doctor_id)):
-    patient = create_patient(
-        name=data.name,
-        email=data.email,
-        phone=data.phone,
-        date_of_birth=data.date_of_birth,
-        location=data.location,
-        medical_history_summary=data.medical_history_summary,
-    )
+    try:
+        patient = create_patient(
+            name=data.name,
+            email=data.email,
+            phone=data.phone,
+            date_of_birth=data.date_of_birth,
+            location=data.location,
+            medical_history_summary=data.medical_history_summary,
+        )
+    except AccountExistsError as e:
+        raise HTTPException(status_code=400, detail=f"{e.field.capitalize()} already registered")
     link_doctor_to_patient(doctor_id, patient["id"])
     return patient
 
 @router.get("/{patient_id}", response_model=PatientResponse)
-def get_patient(patient_id: str, doctor_id: str = Depends(get_doctor_id)):
-    patient = get_patient_by_id(patient_id)
+async def get_patient(patient_id: str, doctor_id: str = Depends(get_doctor_id)):
+    patient, has_access = await async_patient_service.get_patient_with_access(patient_id, doctor_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
-    if not has_doctor_access(doctor_id, patient_id):
+    if not has_access:
         raise HTTPException(status_code=403, detail="No access to this patient")
     return patient
 
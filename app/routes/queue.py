@@ -1,25 +1,34 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from datetime import datetime
-from pydantic import BaseModel
+import json
+from pydantic import BaseModel, Field
 from app.core.security import verify_token_header
-from app.schemas.queue import QueueCreate, QueueStatusResponse, MultiDoctorBookRequest
+from app.core.etag import conditional_json
+from app.schemas.queue import QueueCreate, QueueStatusResponse, MultiDoctorBookRequest, BulkQueueRequest
 from app.services.queue_service import (
-    get_active_queue_for_patient, get_current_serving_token,
-    calculate_position, ai_predict_wait_time, create_queue_entry,
-    check_in_patient, start_consultation, complete_consultation,
-    get_doctor_queue, book_token, book_multi_doctor_token
+    create_queue_entry, check_in_patient, start_consultation, complete_consultation,
+    get_doctor_queue, book_token, book_multi_doctor_token, call_next, set_priority, apply_bulk
 )
-from app.core.database import get_ref
+from app.services import async_queue_service
+from app.services.queue_events import DOCTOR, PATIENT, get_hub
 
 router = APIRouter(prefix="/queue", tags=["Queue Management"])
 
+# Seconds between SSE keep-alive comments / WebSocket pings on a quiet queue
+KEEPALIVE_SECONDS = 20
+
 
 class BookTokenRequest(BaseModel):
     patient_id: str
     doctor_id: str
 
 
+class PriorityRequest(BaseModel):
+    priority: int = Field(..., ge=-10, le=10)
+
+
 def get_patient_id(authorization: Optional[str] = Header(None)) -> str:
     """Extract patient_id from the auth token."""
     patient_id = verify_token_header(authorization)
@@ -28,32 +37,6 @@ def get_patient_id(authorization: Optional[str] = Header(None)) -> str:
     return patient_id
 
 
-def _build_queue_dict(entry: dict, include_ai: bool = True) -> dict:
-    doctor = get_ref(f"doctors/{entry['doctor_id']}").get() or {}
-    patient = get_ref(f"patients/{entry['patient_id']}").get() or {}
-    booking_type = entry.get("booking_type", "appointment")
-
-    result = {
-        "token_number": entry["token_number"],
-        "patient_name": patient.get("name", ""),
-        "doctor_name": doctor.get("name", ""),
-        "current_serving_token": get_current_serving_token(entry["doctor_id"]),
-        "position_in_queue": calculate_position(entry),
-        "status": entry["status"],
-        "booking_type": booking_type,
-        "appointment_time": entry.get("appointment_time"),
-        "check_in_time": entry.get("check_in_time"),
-        "show_queue_status": booking_type == "token",
-    }
-
-    if booking_type == "token" and include_ai:
-        result["estimated_wait_time"] = ai_predict_wait_time(entry)
-    else:
-        result["estimated_wait_time"] = None
-
-    return result
-
-
 @router.post("/book-token")
 def book_token_endpoint(
     data: BookTokenRequest,
@@ -72,17 +55,14 @@ def book_token_endpoint(
     entry = result["entry"]
     prediction = result["ai_prediction"]
 
-    doctor = get_ref(f"doctors/{entry['doctor_id']}").get() or {}
-    patient = get_ref(f"patients/{entry['patient_id']}").get() or {}
-
     return {
         "success": True,
         "already_existed": False,
         "message": "Token booked successfully",
         "token_number": entry["token_number"],
         "booking_type": "token",
-        "patient_name": patient.get("name", ""),
-        "doctor_name": doctor.get("name", ""),
+        "patient_name": entry["patient_name"],
+        "doctor_name": entry["doctor_name"],
         "status": entry["status"],
         "show_queue_status": True,
         "ai_prediction": {
@@ -128,12 +108,15 @@ def book_multi_token_endpoint(
 
 
 @router.get("/status", response_model=QueueStatusResponse)
-def queue_status(patient_id: str, authenticated_id: str = Depends(get_patient_id)):
-    entry = get_active_queue_for_patient(patient_id)
+async def queue_status(request: Request, patient_id: str,
+                       authenticated_id: str = Depends(get_patient_id)):
+    entry = await async_queue_service.get_active_queue_for_patient(patient_id)
     if not entry:
-        return QueueStatusResponse(success=True, has_active_queue=False)
-    return QueueStatusResponse(success=True, has_active_queue=True,
-                               queue_data=_build_queue_dict(entry))
+        return conditional_json(request, QueueStatusResponse(success=True, has_active_queue=False))
+    return conditional_json(request, QueueStatusResponse(
+        success=True, has_active_queue=True,
+        queue_data=await async_queue_service.build_queue_dict(entry),
+    ))
 
 
 @router.get("/doctor-queue")
@@ -142,12 +125,64 @@ def doctor_queue(authenticated_id: str = Depends(get_patient_id)):
     return {"success": True, "count": len(entries), "queue": entries}
 
 
+# ── Push updates ───────────────────────────────────────────────────────────────
+# Instead of polling /queue/status, clients can subscribe to their entries
+# (scope=patient) or, for a doctor, to their queue for today (scope=doctor).
+# The first message is a snapshot, later ones carry only what changed (see
+# app.services.queue_events). /queue/stream is the Server-Sent Events
+# fallback for clients or hosts without WebSockets.
+
+@router.get("/stream")
+async def queue_stream(request: Request,
+                       scope: str = Query(PATIENT, pattern=f"^({PATIENT}|{DOCTOR})$"),
+                       authenticated_id: str = Depends(get_patient_id)):
+    hub = get_hub()
+    subscription = await hub.subscribe(scope, authenticated_id)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                message = await subscription.next_message(KEEPALIVE_SECONDS)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/ws")
+async def queue_socket(websocket: WebSocket, scope: str = PATIENT, token: Optional[str] = None):
+    """Browsers cannot set headers on a WebSocket, so the token may also come as ?token=."""
+    authorization = websocket.headers.get("authorization") or (f"Bearer {token}" if token else None)
+    subject_id = verify_token_header(authorization)
+    if not subject_id or scope not in (PATIENT, DOCTOR):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    hub = get_hub()
+    subscription = await hub.subscribe(scope, subject_id)
+    try:
+        while True:
+            message = await subscription.next_message(KEEPALIVE_SECONDS)
+            await websocket.send_json(message or {"type": "ping"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(subscription)
+
+
 @router.get("/{patient_id}")
-def queue_details(patient_id: str, authenticated_id: str = Depends(get_patient_id)):
-    entry = get_active_queue_for_patient(patient_id)
+async def queue_details(request: Request, patient_id: str,
+                        authenticated_id: str = Depends(get_patient_id)):
+    entry = await async_queue_service.get_active_queue_for_patient(patient_id)
     if not entry:
         raise HTTPException(status_code=404, detail="No active queue entry for this patient")
-    return {"success": True, **_build_queue_dict(entry)}
+    return conditional_json(request, {"success": True,
+                                      **await async_queue_service.build_queue_dict(entry)})
 
 
 @router.post("/create")
@@ -169,6 +204,20 @@ def check_in(patient_id: str, authenticated_id: str = Depends(get_patient_id)):
     return {"success": True, "message": "Patient checked in"}
 
 
+@router.post("/bulk")
+def bulk(data: BulkQueueRequest, authenticated_id: str = Depends(get_patient_id)):
+    """
+    Check in or cancel many patients in one request (reception kiosks).
+    Only bookings with the authenticated doctor, or of the authenticated
+    patient, can be changed. Applied in a single database update; each item
+    gets its own result.
+    """
+    results = apply_bulk([item.model_dump() for item in data.items], authenticated_id)
+    applied = sum(1 for r in results if r["success"])
+    return {"success": True, "applied": applied, "failed": len(results) - applied,
+            "results": results}
+
+
 @router.post("/start/{patient_id}")
 def start(patient_id: str, authenticated_id: str = Depends(get_patient_id)):
     entry = start_consultation(patient_id, authenticated_id)
@@ -183,4 +232,25 @@ def complete(patient_id: str, authenticated_id: str = Depends(get_patient_id)):
     if not entry:
         raise HTTPException(status_code=404, detail="Patient not in serving status")
     return {"success": True, "message": "Consultation completed",
-            "duration_minutes": entry.get("actual_duration")}
\ No newline at end of file
+            "duration_minutes": entry.get("actual_duration")}
+
+
+@router.post("/call-next")
+def call_next_patient(authenticated_id: str = Depends(get_patient_id)):
+    """Start the consultation of the next checked-in token, without looking up its patient."""
+    entry = call_next(authenticated_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="No checked-in patients waiting")
+    return {"success": True, "message": "Consultation started",
+            "token_number": entry["token_number"], "patient_id": entry["patient_id"],
+            "patient_name": entry.get("patient_name", ""), "entry_id": entry["id"]}
+
+
+@router.post("/priority/{patient_id}")
+def prioritize(patient_id: str, data: PriorityRequest,
+               authenticated_id: str = Depends(get_patient_id)):
+    """Move a patient up (priority > 0) or down (< 0) the doctor's queue; 0 is token order."""
+    entry = set_priority(patient_id, authenticated_id, data.priority)
+    if not entry:
+        raise HTTPException(status_code=404, detail="No active queue entry")
+    return {"success": True, "message": "Priority updated", "priority": data.priority}
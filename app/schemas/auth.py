@@ -19,6 +19,11 @@ class RegisterDoctorRequest(BaseModel):
     hospital: str
     password: str
 
+class DoctorProfileUpdate(BaseModel):
+    name: Optional[str] = None
+    specialization: Optional[str] = None
+    hospital: Optional[str] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -39,4 +39,5 @@ class MedicalRecordsListResponse(BaseModel):
     success: bool
     count: int
     patient_name: str
-    records: List[MedicalRecordResponse]
\ No newline at end of file
+    records: List[MedicalRecordResponse]
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -9,6 +9,10 @@ class PatientCreate(BaseModel):
     location: str
     medical_history_summary: Optional[str] = None
 
+class PatientProfileUpdate(BaseModel):
+    name: Optional[str] = None
+    location: Optional[str] = None
+
 class PatientResponse(BaseModel):
     id: str
     name: str
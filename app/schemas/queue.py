@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Literal, Optional, List
 
 
 class QueueCreate(BaseModel):
@@ -25,6 +25,16 @@ class MultiDoctorBookRequest(BaseModel):
     slot_duration_minutes: int = 15
 
 
+class BulkQueueItem(BaseModel):
+    patient_id: str
+    entry_id: Optional[str] = None  # a specific entry of the patient; default: the first that fits
+    action: Literal["check_in", "cancel"]
+
+
+class BulkQueueRequest(BaseModel):
+    items: List[BulkQueueItem] = Field(..., min_length=1, max_length=200)
+
+
 class AIPrediction(BaseModel):
     estimated_minutes: int
     estimated_time: str
@@ -0,0 +1,75 @@
+"""
+Unique lookup indexes for doctor and patient accounts.
+
+    account_index/{kind}/email/{key} -> account id
+    account_index/{kind}/phone/{key} -> account id
+
+kind is "doctors" or "patients"; key is the normalized email/phone made
+safe for use as a database key. Login and duplicate checks become a single
+point read, and registration reserves both entries in transactions so two
+concurrent sign-ups cannot claim the same email or phone.
+"""
+import re
+from typing import Optional
+from urllib.parse import quote
+from app.core.database import get_ref
+
+FIELDS = ("email", "phone")
+
+
+class AccountExistsError(ValueError):
+    def __init__(self, field: str):
+        super().__init__(f"{field} already registered")
+        self.field = field
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def normalize_phone(phone: str) -> str:
+    phone = phone.strip()
+    digits = re.sub(r"\D", "", phone)
+    return ("+" + digits) if phone.startswith("+") else digits
+
+
+def _key(field: str, value: str) -> str:
+    value = normalize_email(value) if field == "email" else normalize_phone(value)
+    # RTDB keys may not contain . $ # [ ] /
+    return quote(value, safe="@+-_").replace(".", "%2E")
+
+
+def _path(kind: str, field: str, value: str) -> str:
+    return f"account_index/{kind}/{field}/{_key(field, value)}"
+
+
+def lookup(kind: str, field: str, value: Optional[str]) -> Optional[str]:
+    """Account id registered under the given email/phone, if any."""
+    if not value or not _key(field, value):
+        return None
+    return get_ref(_path(kind, field, value)).get()
+
+
+def reserve(kind: str, account_id: str, email: Optional[str], phone: Optional[str]):
+    """
+    Claim the email and phone for account_id. Raises AccountExistsError (and
+    releases anything already claimed) if another account holds either one.
+    """
+    claimed = []
+    for field, value in (("email", email), ("phone", phone)):
+        if not value or not _key(field, value):
+            continue
+        path = _path(kind, field, value)
+        owner = get_ref(path).transaction(lambda current: current or account_id)
+        if owner != account_id:
+            for done in claimed:
+                get_ref(done).delete()
+            raise AccountExistsError(field)
+        claimed.append(path)
+
+
+def release(kind: str, account_id: str, email: Optional[str], phone: Optional[str]):
+    """Drop index entries that still point at account_id."""
+    for field, value in (("email", email), ("phone", phone)):
+        if value and lookup(kind, field, value) == account_id:
+            get_ref(_path(kind, field, value)).delete()
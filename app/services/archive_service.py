@@ -0,0 +1,77 @@
+"""
+Hot/cold partitioning of queue data.
+
+The live queues/ tree (the hot data every queue operation reads) only keeps
+active work. Entries that reach a terminal status are moved to the cold, date
+bucketed queue_history/{date}/{entry_id} tree as part of the same write, and
+their durations are folded into duration_stats.
+
+archive_terminal_entries() is the batch job for entries written before this
+existed (or by other paths), and for bookings of past days that never
+finished, which it archives as expired; scripts/archive_queue.py runs it.
+"""
+from typing import Dict
+from app.core.database import get_ref
+from app.services import queue_repository, queue_service
+from app.services.duration_stats import record_durations
+from app.services.queue_repository import TERMINAL_STATUSES
+
+BATCH_SIZE = 500
+
+
+def archive_terminal_entries(today: str, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Move every completed/cancelled entry out of the live queue shards, along
+    with unfinished entries of days before today marked expired, and drop
+    token counters for days before today. Returns counts for reporting.
+    """
+    all_entries = {
+        entry_id: entry
+        for shards in (get_ref("queues").get() or {}).values() if isinstance(shards, dict)
+        for shard in shards.values() if isinstance(shard, dict)
+        for entry_id, entry in shard.items() if isinstance(entry, dict)
+    }
+    terminal = {
+        entry_id: entry for entry_id, entry in all_entries.items()
+        if entry.get("status") in TERMINAL_STATUSES
+    }
+    stamp = queue_service.timestamp()
+    expired = {
+        entry_id: {**entry, "status": "expired", "expired_at": stamp}
+        for entry_id, entry in all_entries.items()
+        if entry_id not in terminal and entry.get("date") and entry["date"] < today
+    }
+    terminal.update(expired)
+
+    ids = list(terminal)
+    for start in range(0, len(ids), batch_size):
+        batch = {i: terminal[i] for i in ids[start:start + batch_size]}
+        queue_repository.archive_entries(batch)
+        record_batch_durations(batch)
+
+    pruned = _prune_token_counters(today)
+    return {"archived": len(terminal), "expired": len(expired),
+            "scanned": len(all_entries), "counters_pruned": pruned}
+
+
+def record_batch_durations(batch: Dict[str, dict]):
+    """Fold the durations of finished entries into duration_stats, one transaction per doctor."""
+    by_doctor: Dict[str, list] = {}
+    for entry in batch.values():
+        if entry.get("actual_duration") is not None:
+            by_doctor.setdefault(entry.get("doctor_id"), []).append(entry["actual_duration"])
+    for doctor_id, durations in by_doctor.items():
+        if doctor_id:
+            record_durations(doctor_id, durations)
+
+
+def _prune_token_counters(today: str) -> int:
+    counters = get_ref("token_counters").get() or {}
+    updates = {
+        f"token_counters/{doctor_id}/{date}": None
+        for doctor_id, dates in counters.items() if isinstance(dates, dict)
+        for date in dates if date < today
+    }
+    if updates:
+        get_ref("/").update(updates)
+    return len(updates)
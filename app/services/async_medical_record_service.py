@@ -0,0 +1,40 @@
+"""Async versions of the medical_record_service reads used by async route handlers."""
+import asyncio
+from typing import List, Optional, Tuple
+from app.core.async_database import aget_ref
+from app.services.loader import aload_many
+from app.services import name_snapshots
+from app.services.medical_record_service import RECORD_INDEX, page_query, split_page
+
+
+async def get_patient_records(patient_id: str, limit: Optional[int] = None,
+                              after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    A page of a patient's records, newest first, with their name snapshots,
+    and the cursor for the next page (None on the last one).
+    """
+    end_at, last = page_query(limit, after)
+    index_ref = aget_ref(f"{RECORD_INDEX}/{patient_id}")
+    if last is None:
+        index = await index_ref.get() or {}
+    else:
+        index = await index_ref.get_by_key(end_at=end_at, limit_to_last=last)
+    record_ids, next_cursor = split_page(index, limit, after)
+    loaded = await aload_many("medical_records", record_ids)
+    records = []
+    for record_id in record_ids:
+        record = loaded.get(record_id)
+        if record:
+            record["id"] = record_id
+            records.append(record)
+    await name_snapshots.afill_missing(records)
+    return records, next_cursor
+
+
+async def get_patient_and_records(patient_id: str, limit: Optional[int] = None,
+                                  after: Optional[str] = None):
+    """Fetch the patient profile and a page of their records concurrently."""
+    return await asyncio.gather(
+        aget_ref(f"patients/{patient_id}").get(),
+        get_patient_records(patient_id, limit, after),
+    )
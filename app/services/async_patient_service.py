@@ -0,0 +1,39 @@
+"""Async versions of the patient_service reads used by async route handlers."""
+import asyncio
+from typing import List, Optional, Sequence
+from app.core.async_database import aget_ref
+from app.services.loader import aload_many
+
+
+async def has_doctor_access(doctor_id: str, patient_id: str) -> bool:
+    link = await aget_ref(f"doctor_patient/{doctor_id}_{patient_id}").get()
+    return link is not None
+
+
+async def get_patient_by_id(patient_id: str) -> Optional[dict]:
+    data = await aget_ref(f"patients/{patient_id}").get()
+    if data:
+        data["id"] = patient_id
+    return data
+
+
+async def get_patient_with_access(patient_id: str, doctor_id: str):
+    """Fetch the patient and the doctor's access link concurrently."""
+    return await asyncio.gather(
+        get_patient_by_id(patient_id), has_doctor_access(doctor_id, patient_id)
+    )
+
+
+async def get_all_doctor_patients(doctor_id: str,
+                                  fields: Optional[Sequence[str]] = None) -> List[dict]:
+    patient_ids = list(await aget_ref(f"doctor_patients/{doctor_id}").get() or {})
+    if fields is not None:
+        fields = tuple(dict.fromkeys((*fields, "is_active")))
+    loaded = await aload_many("patients", patient_ids, fields)
+    patients = []
+    for patient_id in dict.fromkeys(patient_ids):
+        patient = loaded.get(patient_id)
+        if patient and patient.get("is_active", True):
+            patient["id"] = patient_id
+            patients.append(patient)
+    return patients
@@ -0,0 +1,66 @@
+"""
+Async entry points to the queue service for async route handlers.
+
+Queue lookups are answered by the in-process queue repository. The
+patient's pointers and the queue shards it needs are read through
+app.core.async_database, concurrently, before the repository is consulted,
+so the lookups themselves are in memory. Position and wait prediction still
+run in a worker thread: on a prediction cache miss they read the doctor's
+duration summary (and, every WAIT_MODEL_RELOAD_SECONDS, the model version)
+with the blocking client. Doctor and patient names are read from the
+entry's snapshot.
+"""
+import asyncio
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from app.services import name_snapshots, queue_repository
+from app.services.queue_repository import ACTIVE_STATUSES
+from app.services.queue_service import (
+    get_current_serving_token, calculate_position, ai_predict_wait_time, today_str,
+)
+
+
+async def get_active_queue_for_patient(patient_id: str) -> Optional[dict]:
+    entries = await queue_repository.afind_entries(patient_id, status=ACTIVE_STATUSES)
+    return entries[0] if entries else None
+
+
+def _queue_metrics(entry: dict, include_ai: bool) -> dict:
+    booking_type = entry.get("booking_type", "appointment")
+    prediction = None
+    if booking_type == "token" and include_ai:
+        prediction = ai_predict_wait_time(entry)
+        position = prediction["patients_ahead"] + 1
+    else:
+        position = calculate_position(entry)
+    return {
+        "current_serving_token": get_current_serving_token(entry["doctor_id"]),
+        "position_in_queue": position,
+        "estimated_wait_time": prediction,
+    }
+
+
+async def build_queue_dict(entry: dict, include_ai: bool = True) -> dict:
+    # Names come from the entry's snapshot; only entries stored without one are joined
+    today = today_str()
+    shards = [(entry["doctor_id"], entry.get("date") or today), (entry["doctor_id"], today)]
+    await asyncio.gather(
+        name_snapshots.afill_missing([entry]),
+        queue_repository.aensure_shards(shards),
+    )
+    metrics = await run_in_threadpool(_queue_metrics, entry, include_ai)
+    booking_type = entry.get("booking_type", "appointment")
+
+    return {
+        "token_number": entry["token_number"],
+        "patient_name": entry["patient_name"],
+        "doctor_name": entry["doctor_name"],
+        "current_serving_token": metrics["current_serving_token"],
+        "position_in_queue": metrics["position_in_queue"],
+        "status": entry["status"],
+        "booking_type": booking_type,
+        "appointment_time": entry.get("appointment_time"),
+        "check_in_time": entry.get("check_in_time"),
+        "show_queue_status": booking_type == "token",
+        "estimated_wait_time": metrics["estimated_wait_time"],
+    }
@@ -1,38 +1,43 @@
 from typing import Optional
 from app.core.database import get_ref
 from app.core.security import verify_password, get_password_hash, create_access_token
+from app.services import account_index
 import uuid
 
 
 def authenticate_doctor(phone: Optional[str], email: Optional[str], password: str) -> Optional[dict]:
-    doctors = get_ref("doctors").get() or {}
-    for doc_id, doctor in doctors.items():
-        if not doctor.get("is_active", True):
+    for field, value in (("email", email), ("phone", phone)):
+        doc_id = account_index.lookup("doctors", field, value)
+        if not doc_id:
             continue
-        if email and doctor.get("email") == email:
-            if verify_password(password, doctor["hashed_password"]):
-                doctor["id"] = doc_id
-                return doctor
-        elif phone and doctor.get("phone") == phone:
-            if verify_password(password, doctor["hashed_password"]):
-                doctor["id"] = doc_id
-                return doctor
+        doctor = get_doctor_by_id(doc_id)
+        if not doctor or not doctor.get("is_active", True):
+            continue
+        if verify_password(password, doctor["hashed_password"]):
+            return doctor
     return None
 
 
 def register_doctor(name: str, email: str, phone: str,
                     specialization: str, hospital: str, password: str) -> dict:
+    """Raises account_index.AccountExistsError if the email or phone is taken."""
     doctor_id = str(uuid.uuid4())
-    doctor_data = {
-        "name": name,
-        "email": email,
-        "phone": phone,
-        "specialization": specialization,
-        "hospital": hospital,
-        "hashed_password": get_password_hash(password),
-        "is_active": True,
-    }
-    get_ref(f"doctors/{doctor_id}").set(doctor_data)
+    account_index.reserve("doctors", doctor_id, email, phone)
+    try:
+        doctor_data = {
+            "name": name,
+            "email": email,
+            "phone": phone,
+            "specialization": specialization,
+            "hospital": hospital,
+            "hashed_password": get_password_hash(password),
+            "is_active": True,
+        }
+        get_ref(f"doctors/{doctor_id}").set(doctor_data)
+    except Exception:
+        # Without the doctor, the reservations would lock the email and phone out
+        account_index.release("doctors", doctor_id, email, phone)
+        raise
     doctor_data["id"] = doctor_id
     return doctor_data
 
@@ -45,4 +50,12 @@ def get_doctor_by_id(doctor_id: str) -> Optional[dict]:
     data = get_ref(f"doctors/{doctor_id}").get()
     if data:
         data["id"] = doctor_id
-    return data
\ No newline at end of file
+    return data
+
+def update_doctor_profile(doctor_id: str, **kwargs) -> Optional[dict]:
+    if not get_ref(f"doctors/{doctor_id}").get():
+        return None
+    updates = {k: v for k, v in kwargs.items() if v is not None}
+    if updates:
+        get_ref(f"doctors/{doctor_id}").update(updates)
+    return get_doctor_by_id(doctor_id)
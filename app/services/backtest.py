@@ -0,0 +1,234 @@
+"""
+Replay of historical queue days for measuring wait-time predictions.
+
+Finished entries (queue_history, legacy flat queue_entries, or the same
+trees from a JSON export of the database) are turned back into their
+booking, check-in, start, completion and cancellation events. The events are
+replayed in time order into an empty in-process database through
+queue_repository, with the service clock set to each event's time. After
+every event, each token entry still waiting in that doctor's queue is run
+through queue_service.ai_predict_wait_time(). The predicted start (event
+time + estimated_minutes) is compared with the entry's actual
+consultation_start_time.
+
+Each call's wall time and database reads are recorded too, so model and
+performance changes can be compared on the same dataset. Duration
+statistics start empty and build up as completions are replayed; the first
+warmup_days days are replayed without being scored. The coefficient table
+of the source database, if any, is used for the whole run.
+"""
+import json
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.database import get_ref, isolated_local_db
+from app.core.local_db import LocalDatabase
+from app.services import duration_stats, queue_repository, queue_service, wait_model, wait_predictor
+from app.services.wait_model import MODEL_PATH
+from app.simulation.metrics import error_summary, summary
+
+# Replay order of events that share a timestamp
+BOOK, CHECK_IN, START, COMPLETE, CANCEL = range(5)
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _format_time(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+# ── Loading ────────────────────────────────────────────────────────────────────
+
+def entries_from_tree(tree: dict) -> Dict[str, dict]:
+    """Finished entries from a database export (or the matching live subtrees)."""
+    entries = {}
+    for day in (tree.get("queue_history") or {}).values():
+        for entry_id, entry in (day or {}).items():
+            if isinstance(entry, dict):
+                entries[entry_id] = entry
+    for entry_id, entry in (tree.get("queue_entries") or {}).items():
+        if isinstance(entry, dict):
+            entries[entry_id] = entry
+    for shards in (tree.get("queues") or {}).values():
+        for shard in (shards or {}).values():
+            for entry_id, entry in (shard or {}).items():
+                if isinstance(entry, dict):
+                    entries[entry_id] = entry
+    return entries
+
+
+def load_snapshot(path: str) -> Tuple[Dict[str, dict], Optional[dict]]:
+    """(entries, coefficient table) from a JSON export of the database root."""
+    with open(path) as f:
+        tree = json.load(f)
+    model = tree.get(MODEL_PATH) or {}
+    return entries_from_tree(tree), model.get("table")
+
+
+def load_database(since: Optional[str] = None,
+                  until: Optional[str] = None) -> Tuple[Dict[str, dict], Optional[dict]]:
+    """(entries, coefficient table) from the configured database, dates within [since, until]."""
+    query = get_ref("queue_history").order_by_key()
+    if since:
+        query = query.start_at(since)
+    if until:
+        query = query.end_at(until)
+    tree = {
+        "queue_history": query.get() or {},
+        "queue_entries": get_ref("queue_entries").get() or {},
+    }
+    return entries_from_tree(tree), get_ref(f"{MODEL_PATH}/table").get()
+
+
+# ── Events ─────────────────────────────────────────────────────────────────────
+
+def build_events(entries: Dict[str, dict]) -> List[Tuple[datetime, int, str]]:
+    """(time, kind, entry_id) for every replayable entry, in replay order."""
+    events = []
+    for entry_id, entry in entries.items():
+        if not entry.get("doctor_id") or not entry.get("patient_id"):
+            continue
+        check_in = _parse_time(entry.get("check_in_time"))
+        start = _parse_time(entry.get("consultation_start_time"))
+        end = _parse_time(entry.get("consultation_end_time"))
+        cancelled = _parse_time(entry.get("cancelled_at"))
+        stamps = [t for t in (check_in, start, end, cancelled) if t is not None]
+        booked = _parse_time(entry.get("appointment_time"))
+        if booked is None and not stamps:
+            continue
+        # Appointment times can be later than the visit; book no later than the first event
+        booked = min([booked] + stamps) if booked is not None else min(stamps)
+        events.append((booked, BOOK, entry_id))
+        if check_in:
+            events.append((check_in, CHECK_IN, entry_id))
+        if start:
+            events.append((start, START, entry_id))
+        if end and entry.get("status") == "completed":
+            events.append((end, COMPLETE, entry_id))
+        elif cancelled and entry.get("status") == "cancelled":
+            events.append((cancelled, CANCEL, entry_id))
+    events.sort()
+    return events
+
+
+class Replay:
+    def __init__(self, entries: Dict[str, dict], warmup_days: int = 0):
+        self.entries = entries
+        self.events = build_events(entries)
+        dates = sorted({moment.date().isoformat() for moment, _, _ in self.events})
+        self.scored_from = dates[warmup_days] if warmup_days < len(dates) else None
+        self.live: Dict[str, dict] = {}
+        self.now: Optional[datetime] = None
+        self.errors: List[float] = []
+        self.latencies: List[float] = []
+        self.reads: List[int] = []
+        self.database: Optional[LocalDatabase] = None
+
+    def _apply(self, kind: int, entry_id: str):
+        source = self.entries[entry_id]
+        stamp = _format_time(self.now)
+        if kind == BOOK:
+            data = {
+                "token_number": source.get("token_number", 0),
+                "patient_id": source["patient_id"],
+                "doctor_id": source["doctor_id"],
+                "appointment_time": source.get("appointment_time") or stamp,
+                "status": "confirmed",
+                "booking_type": source.get("booking_type", "token"),
+                "check_in_time": None,
+                "consultation_start_time": None,
+                "consultation_end_time": None,
+                "actual_duration": None,
+                "date": self.now.date().isoformat(),
+            }
+            queue_repository.insert_entry(entry_id, data)
+            self.live[entry_id] = {**data, "id": entry_id}
+            return
+        entry = self.live.get(entry_id)
+        if entry is None:
+            return
+        if kind == CHECK_IN:
+            changes = {"status": "waiting", "check_in_time": stamp}
+        elif kind == START:
+            changes = {"status": "serving", "consultation_start_time": stamp}
+        else:
+            if kind == COMPLETE:
+                duration = source.get("actual_duration")
+                changes = {"status": "completed", "consultation_end_time": stamp,
+                           "actual_duration": duration}
+            else:
+                changes = {"status": "cancelled", "cancelled_at": stamp}
+            queue_repository.archive_entry(entry, changes)
+            del self.live[entry_id]
+            if kind == COMPLETE and duration is not None:
+                duration_stats.record_durations(entry["doctor_id"], [duration])
+            return
+        queue_repository.update_entry(entry, changes)
+        entry.update(changes)
+
+    def _score(self, doctor_id: str):
+        for entry in list(self.live.values()):
+            if entry["doctor_id"] != doctor_id or entry["status"] not in ("confirmed", "waiting"):
+                continue
+            if entry.get("booking_type", "token") != "token":
+                continue
+            actual = _parse_time(self.entries[entry["id"]].get("consultation_start_time"))
+            if actual is None:
+                continue
+            reads = self.database.stats["reads"]
+            started = time.perf_counter()
+            prediction = queue_service.ai_predict_wait_time(dict(entry))
+            self.latencies.append(time.perf_counter() - started)
+            self.reads.append(self.database.stats["reads"] - reads)
+            predicted_wait = prediction["estimated_minutes"]
+            actual_wait = (actual - self.now).total_seconds() / 60
+            self.errors.append(predicted_wait - actual_wait)
+
+    def run(self, model_table: Optional[dict] = None) -> dict:
+        self.database = LocalDatabase()
+        if model_table:
+            self.database.write(MODEL_PATH.split("/"), {"version": 1, "table": model_table})
+        with isolated_local_db(self.database):
+            _reset_caches()
+            queue_service.set_clock(lambda: self.now)
+            try:
+                for moment, kind, entry_id in self.events:
+                    self.now = moment
+                    self._apply(kind, entry_id)
+                    if self.scored_from and moment.date().isoformat() >= self.scored_from:
+                        self._score(self.entries[entry_id]["doctor_id"])
+            finally:
+                queue_service.set_clock(None)
+                _reset_caches()
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "events": len(self.events),
+            "scored_from": self.scored_from,
+            "predictions": len(self.errors),
+            "error_minutes": error_summary(self.errors),
+            "latency_ms": summary(np.array(self.latencies) * 1000),
+            "reads_per_call": summary(self.reads),
+        }
+
+
+def _reset_caches():
+    queue_repository.reset()
+    wait_predictor.clear_cache()
+    wait_model.reload()
+
+
+def backtest(entries: Dict[str, dict], model_table: Optional[dict] = None,
+             warmup_days: int = 0) -> dict:
+    return Replay(entries, warmup_days).run(model_table)
@@ -0,0 +1,36 @@
+"""
+Transactional integer counters stored in the database.
+
+Used wherever a value used to be derived as max(existing) + 1 from a full
+tree scan. An RTDB transaction makes the increment atomic across workers,
+so concurrent callers always receive distinct values.
+"""
+from typing import Callable
+from app.core.database import get_ref
+
+
+def next_value(path: str, seed: Callable[[], int]) -> int:
+    """
+    Atomically increment the counter at path and return the new value.
+    seed() gives the current high-water mark when the counter node does
+    not exist yet (e.g. data written before counters were introduced); it
+    is called at most once.
+    """
+    return allocate_block(path, 1, seed)[0]
+
+
+def allocate_block(path: str, count: int, seed: Callable[[], int]) -> range:
+    """Atomically reserve count consecutive values and return them as a range."""
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    seeded = []
+
+    def increment(current):
+        if current is None:
+            if not seeded:
+                seeded.append(seed())
+            current = seeded[0]
+        return int(current) + count
+
+    end = get_ref(path).transaction(increment)
+    return range(end - count + 1, end + 1)
@@ -0,0 +1,93 @@
+"""
+Compact per-doctor summary of consultation durations.
+
+duration_stats/{doctor_id} holds a histogram of completed consultation
+lengths in whole minutes, which doubles as an exact quantile sketch (at most
+MAX_DURATION - MIN_DURATION + 1 buckets), and a summary that is recomputed
+whenever durations are folded in:
+
+    {
+        "hist": {"m12": 7, ...},  # minutes -> occurrences ("m" prefix keeps
+                                  #  RTDB from turning the map into an array)
+        "summary": {
+            "count": 42,          # durations within [MIN_DURATION, MAX_DURATION]
+            "observed": 45,       # every recorded duration
+            "median": 14.0,
+            "p90": 22.0,
+            "ewma": 15.3,         # recent trend, newest durations weigh EWMA_ALPHA
+        }
+    }
+
+Durations are folded in once, when a consultation completes (or when an
+entry is archived), so predictions read the small summary node instead of
+re-aggregating history on every status poll.
+"""
+from typing import Iterable, List, Optional, Tuple
+from app.core.database import get_ref
+
+MIN_DURATION = 2
+MAX_DURATION = 120
+EWMA_ALPHA = 0.2
+
+
+def _fold(stats: Optional[dict], durations: Iterable[int]) -> dict:
+    stats = stats or {}
+    hist = dict(stats.get("hist") or {})
+    summary = dict(stats.get("summary") or {})
+    for minutes in durations:
+        summary["observed"] = summary.get("observed", 0) + 1
+        if isinstance(minutes, (int, float)) and MIN_DURATION <= minutes <= MAX_DURATION:
+            key = f"m{int(minutes)}"
+            hist[key] = hist.get(key, 0) + 1
+            summary["count"] = summary.get("count", 0) + 1
+            ewma = summary.get("ewma")
+            summary["ewma"] = float(minutes) if ewma is None else (
+                EWMA_ALPHA * minutes + (1 - EWMA_ALPHA) * ewma
+            )
+    buckets = _buckets(hist)
+    summary["median"] = _quantile(buckets, 0.5)
+    summary["p90"] = _quantile(buckets, 0.9)
+    return {"hist": hist, "summary": summary}
+
+
+def record_durations(doctor_id: str, durations: Iterable[int]):
+    """Fold finished consultation durations into the doctor's summary."""
+    durations = list(durations)
+    if durations:
+        get_ref(f"duration_stats/{doctor_id}").transaction(lambda cur: _fold(cur, durations))
+
+
+def get_stats(doctor_id: str) -> dict:
+    """The doctor's summary: count, observed, median, p90 and ewma (missing when empty)."""
+    return get_ref(f"duration_stats/{doctor_id}/summary").get() or {}
+
+
+def _buckets(hist: dict) -> List[Tuple[int, int]]:
+    return sorted((int(k[1:]), n) for k, n in hist.items())
+
+
+def _quantile(buckets: List[Tuple[int, int]], q: float) -> Optional[float]:
+    total = sum(n for _, n in buckets)
+    if not total:
+        return None
+
+    def nth(rank: int) -> int:
+        seen = 0
+        for minutes, n in buckets:
+            seen += n
+            if seen > rank:
+                return minutes
+        return buckets[-1][0]
+
+    # Linear interpolation between the two closest ranks
+    position = q * (total - 1)
+    lower = int(position)
+    low = nth(lower)
+    if position == lower:
+        return float(low)
+    return low + (nth(lower + 1) - low) * (position - lower)
+
+
+def median_duration(stats: dict) -> Optional[float]:
+    """Median from a summary, or None when no durations were recorded."""
+    return stats.get("median")
@@ -0,0 +1,69 @@
+"""
+Batched lookups of doctors/patients for listing endpoints.
+
+Instead of one get_ref(f"doctors/{id}") per row, callers collect the ids a
+response needs and call load_many() once: each distinct id is fetched a
+single time and the fetches run concurrently.
+
+With fields=(...) only those children are read, one path per field, so
+large or sensitive fields (hashed_password, medical_history_summary) are
+not transferred when the response does not use them.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+from app.core.database import get_ref
+from app.core.async_database import aget_ref
+
+MAX_WORKERS = 8
+
+
+def _paths(collection: str, distinct: List[str], fields: Optional[Sequence[str]]):
+    if fields is None:
+        return [(i, None, f"{collection}/{i}") for i in distinct]
+    return [(i, f, f"{collection}/{i}/{f}") for i in distinct for f in fields]
+
+
+def _assemble(distinct: List[str], paths, values) -> Dict[str, dict]:
+    result: Dict[str, dict] = {i: {} for i in distinct}
+    for (item_id, field, _), value in zip(paths, values):
+        if field is None:
+            result[item_id] = value or {}
+        elif value is not None:
+            result[item_id][field] = value
+    return result
+
+
+def load_many(collection: str, ids: Iterable[str],
+              fields: Optional[Sequence[str]] = None) -> Dict[str, dict]:
+    """
+    Fetch {id: data} for each distinct id under collection. Missing ids map to {}.
+    With fields, data holds only those of the fields that are set.
+    """
+    distinct = [i for i in dict.fromkeys(ids) if i]
+    if not distinct:
+        return {}
+    paths = _paths(collection, distinct, fields)
+
+    def fetch(path: str):
+        return get_ref(path).get()
+
+    if len(paths) == 1:
+        return _assemble(distinct, paths, [fetch(paths[0][2])])
+
+    # Each worker runs in a copy of the caller's context so the
+    # request-scoped read cache is shared with the request.
+    ctx = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(paths))) as pool:
+        futures = [pool.submit(ctx.copy().run, fetch, path) for _, _, path in paths]
+        return _assemble(distinct, paths, [f.result() for f in futures])
+
+
+async def aload_many(collection: str, ids: Iterable[str],
+                     fields: Optional[Sequence[str]] = None) -> Dict[str, dict]:
+    """Async load_many(): the distinct fetches are awaited together."""
+    distinct = [i for i in dict.fromkeys(ids) if i]
+    paths = _paths(collection, distinct, fields)
+    values = await asyncio.gather(*(aget_ref(path).get() for _, _, path in paths))
+    return _assemble(distinct, paths, values)
@@ -1,24 +1,50 @@
-from typing import List, Optional
+import re
+from typing import Dict, List, Optional, Tuple
 from app.core.database import get_ref
-from app.services.patient_service import has_doctor_access, link_doctor_to_patient, get_patient_by_id
+from app.services.patient_service import link_doctor_to_patient, get_patient_by_id
+from app.services import name_snapshots
 import uuid
 
+# records_by_patient/{patient_id}/{visit_date}_{record_id} -> record_id
+# Keys sort by visit date, so a page of a patient's history is one key-range query.
+RECORD_INDEX = "records_by_patient"
+# records_by_doctor/{doctor_id}/{record_id} -> True, for the name snapshot fan-out
+DOCTOR_RECORD_INDEX = "records_by_doctor"
 
-def get_medical_records(patient_id: str, doctor_id: str) -> List[dict]:
-    if not has_doctor_access(doctor_id, patient_id):
-        return []
-    all_records = get_ref("medical_records").get() or {}
-    records = []
-    for rec_id, record in all_records.items():
-        if record.get("patient_id") == patient_id:
-            record["id"] = rec_id
-            patient = get_patient_by_id(patient_id)
-            doctor = get_ref(f"doctors/{record['doctor_id']}").get() or {}
-            record["patient_name"] = patient["name"] if patient else ""
-            record["doctor_name"] = doctor.get("name", "")
-            records.append(record)
-    records.sort(key=lambda x: x.get("visit_date", ""), reverse=True)
-    return records
+_KEY_UNSAFE = re.compile(r"[.$#\[\]/]")
+
+
+def record_index_key(record_id: str, visit_date: str) -> str:
+    return f"{_KEY_UNSAFE.sub('-', visit_date or '')}_{record_id}"
+
+
+def record_index_updates(record_id: str, record: dict) -> dict:
+    key = record_index_key(record_id, record.get("visit_date", ""))
+    updates = {f"{RECORD_INDEX}/{record['patient_id']}/{key}": record_id}
+    if record.get("doctor_id"):
+        updates[f"{DOCTOR_RECORD_INDEX}/{record['doctor_id']}/{record_id}"] = True
+    return updates
+
+
+def page_query(limit: Optional[int], after: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """(end_at, limit_to_last) for the index query of one page, newest first."""
+    if limit is None:
+        return None, None
+    # One extra key tells whether there is a next page; end_at is inclusive,
+    # so the cursor key itself comes back too.
+    return after, limit + 1 + (1 if after else 0)
+
+
+def split_page(index: Dict[str, str], limit: Optional[int],
+               after: Optional[str]) -> Tuple[List[str], Optional[str]]:
+    """Record ids of the page after the cursor, newest first, and the next cursor."""
+    keys = sorted(index, reverse=True)
+    if after:
+        keys = [k for k in keys if k < after]
+    if limit is None or len(keys) <= limit:
+        return [index[k] for k in keys], None
+    page = keys[:limit]
+    return [index[k] for k in page], page[-1]
 
 
 def create_medical_record(doctor_id: str, patient_id: str, diagnosis: str,
@@ -36,8 +62,12 @@ def create_medical_record(doctor_id: str, patient_id: str, diagnosis: str,
         "notes": notes,
         "follow_up_date": follow_up_date,
         "vital_signs": vital_signs,
+        **name_snapshots.snapshot(doctor_id, patient_id),
     }
-    get_ref(f"medical_records/{record_id}").set(record_data)
+    get_ref("/").update({
+        f"medical_records/{record_id}": record_data,
+        **record_index_updates(record_id, record_data),
+    })
 
     # Update patient visit stats
     patient = get_patient_by_id(patient_id)
@@ -50,9 +80,6 @@ def create_medical_record(doctor_id: str, patient_id: str, diagnosis: str,
     link_doctor_to_patient(doctor_id, patient_id)
 
     record_data["id"] = record_id
-    doctor = get_ref(f"doctors/{doctor_id}").get() or {}
-    record_data["patient_name"] = patient["name"] if patient else ""
-    record_data["doctor_name"] = doctor.get("name", "")
     return record_data
 
 
@@ -67,8 +94,4 @@ def update_medical_record(record_id: str, doctor_id: str, **kwargs) -> Optional[
         get_ref(f"medical_records/{record_id}").update(updates)
     updated = get_ref(f"medical_records/{record_id}").get()
     updated["id"] = record_id
-    patient = get_patient_by_id(updated["patient_id"])
-    doctor = get_ref(f"doctors/{doctor_id}").get() or {}
-    updated["patient_name"] = patient["name"] if patient else ""
-    updated["doctor_name"] = doctor.get("name", "")
-    return updated
\ No newline at end of file
+    return name_snapshots.fill_missing([updated])[0]
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Display names stored on queue entries and medical records.
+
+Entries and records carry doctor_name, doctor_specialization and
+patient_name, copied from the doctor/patient when they are written, so
+listing and status reads need no joins. When a doctor or patient is renamed,
+fan_out() rewrites those copies on the live queue entries, each only if it
+still exists, and on medical records in one multi-path update; it is run as
+a background task after the profile update.
+
+Rows written before snapshots existed are joined on read by fill_missing().
+scripts/backfill_indexes.py names stores snapshots on them.
+"""
+from typing import Dict, Iterable, List
+from app.core.database import get_ref
+from app.services import queue_repository
+from app.services.loader import load_many, aload_many
+
+# Snapshot field on an entry/record -> source field on the doctor/patient
+DOCTOR_SNAPSHOT = {"doctor_name": "name", "doctor_specialization": "specialization"}
+PATIENT_SNAPSHOT = {"patient_name": "name"}
+
+SNAPSHOTS = {
+    "doctors": ("doctor_id", DOCTOR_SNAPSHOT),
+    "patients": ("patient_id", PATIENT_SNAPSHOT),
+}
+
+
+def affects_snapshots(kind: str, changes: dict) -> bool:
+    """Whether a profile update of a doctor/patient changes stored snapshots."""
+    _, fields = SNAPSHOTS[kind]
+    return any(changes.get(source) is not None for source in fields.values())
+
+
+def snapshot_of(kind: str, data: dict) -> Dict[str, str]:
+    """Snapshot fields for a loaded doctor or patient."""
+    _, fields = SNAPSHOTS[kind]
+    return {target: data.get(source, "") for target, source in fields.items()}
+
+
+def snapshot(doctor_id: str, patient_id: str) -> Dict[str, str]:
+    """Snapshot fields to store on an entry/record of doctor_id and patient_id."""
+    doctors = load_many("doctors", [doctor_id], tuple(DOCTOR_SNAPSHOT.values()))
+    patients = load_many("patients", [patient_id], tuple(PATIENT_SNAPSHOT.values()))
+    return {
+        **snapshot_of("doctors", doctors.get(doctor_id, {})),
+        **snapshot_of("patients", patients.get(patient_id, {})),
+    }
+
+
+def _missing(rows: List[dict], kind: str) -> List[dict]:
+    id_field, fields = SNAPSHOTS[kind]
+    return [r for r in rows if r.get(id_field) and not all(f in r for f in fields)]
+
+
+def _fill(rows: List[dict], kind: str, loaded: Dict[str, dict]):
+    id_field, _ = SNAPSHOTS[kind]
+    for row in rows:
+        for field, value in snapshot_of(kind, loaded.get(row[id_field], {})).items():
+            row.setdefault(field, value)
+
+
+def fill_missing(rows: List[dict]) -> List[dict]:
+    """Join names onto rows stored without snapshots; rows that have them are untouched."""
+    for kind, (id_field, fields) in SNAPSHOTS.items():
+        missing = _missing(rows, kind)
+        if missing:
+            loaded = load_many(kind, (r[id_field] for r in missing), tuple(fields.values()))
+            _fill(missing, kind, loaded)
+    return rows
+
+
+async def afill_missing(rows: List[dict]) -> List[dict]:
+    """Async fill_missing()."""
+    for kind, (id_field, fields) in SNAPSHOTS.items():
+        missing = _missing(rows, kind)
+        if missing:
+            loaded = await aload_many(kind, (r[id_field] for r in missing), tuple(fields.values()))
+            _fill(missing, kind, loaded)
+    return rows
+
+
+def _record_ids(kind: str, item_id: str) -> Iterable[str]:
+    from app.services.medical_record_service import DOCTOR_RECORD_INDEX, RECORD_INDEX
+    if kind == "patients":
+        return (get_ref(f"{RECORD_INDEX}/{item_id}").get() or {}).values()
+    return (get_ref(f"{DOCTOR_RECORD_INDEX}/{item_id}").get(shallow=True) or {}).keys()
+
+
+def fan_out(kind: str, item_id: str):
+    """Rewrite the snapshots of doctor/patient item_id on live queue entries and records."""
+    id_field, fields = SNAPSHOTS[kind]
+    current = load_many(kind, [item_id], tuple(fields.values())).get(item_id)
+    if not current:
+        return
+    changes = snapshot_of(kind, current)
+
+    if kind == "doctors":
+        entries = queue_repository.find_doctor_entries(item_id)
+    else:
+        entries = queue_repository.find_entries(patient_id=item_id)
+    queue_repository.update_entries(entries, changes)
+
+    updates = {
+        f"medical_records/{record_id}/{field}": value
+        for record_id in _record_ids(kind, item_id)
+        for field, value in changes.items()
+    }
+    if updates:
+        get_ref("/").update(updates)
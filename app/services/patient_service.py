@@ -1,5 +1,8 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from app.core.database import get_ref
+from app.services.loader import load_many
+from app.services.counters import allocate_block
+from app.services import account_index
 import uuid
 
 def has_doctor_access(doctor_id: str, patient_id: str) -> bool:
@@ -7,11 +10,24 @@ def has_doctor_access(doctor_id: str, patient_id: str) -> bool:
     return link is not None
 
 def link_doctor_to_patient(doctor_id: str, patient_id: str):
+    """
+    Record the link plus both adjacency entries
+    (doctor_patients/{doctor}/{patient}, patient_doctors/{patient}/{doctor})
+    in one multi-path update.
+    """
     if not has_doctor_access(doctor_id, patient_id):
-        get_ref(f"doctor_patient/{doctor_id}_{patient_id}").set({
+        get_ref("/").update(link_updates(doctor_id, patient_id))
+
+
+def link_updates(doctor_id: str, patient_id: str) -> dict:
+    return {
+        f"doctor_patient/{doctor_id}_{patient_id}": {
             "doctor_id": doctor_id,
             "patient_id": patient_id,
-        })
+        },
+        f"doctor_patients/{doctor_id}/{patient_id}": True,
+        f"patient_doctors/{patient_id}/{doctor_id}": True,
+    }
 
 def get_patient_by_id(patient_id: str) -> Optional[dict]:
     data = get_ref(f"patients/{patient_id}").get()
@@ -19,18 +35,36 @@ def get_patient_by_id(patient_id: str) -> Optional[dict]:
         data["id"] = patient_id
     return data
 
-def get_all_doctor_patients(doctor_id: str) -> List[dict]:
-    all_links = get_ref("doctor_patient").get() or {}
+def update_patient_profile(patient_id: str, **kwargs) -> Optional[dict]:
+    if not get_patient_by_id(patient_id):
+        return None
+    updates = {k: v for k, v in kwargs.items() if v is not None}
+    if updates:
+        get_ref(f"patients/{patient_id}").update(updates)
+    return get_patient_by_id(patient_id)
+
+def get_all_doctor_patients(doctor_id: str, fields: Optional[Sequence[str]] = None) -> List[dict]:
+    """Active patients of doctor_id; with fields, only those fields are read."""
+    patient_ids = list(get_ref(f"doctor_patients/{doctor_id}").get() or {})
+    if fields is not None:
+        fields = tuple(dict.fromkeys((*fields, "is_active")))
+    loaded = load_many("patients", patient_ids, fields)
     patients = []
-    for key, link in all_links.items():
-        if link.get("doctor_id") == doctor_id:
-            patient = get_patient_by_id(link["patient_id"])
-            if patient and patient.get("is_active", True):
-                patients.append(patient)
+    for patient_id in dict.fromkeys(patient_ids):
+        patient = loaded.get(patient_id)
+        if patient and patient.get("is_active", True):
+            patient["id"] = patient_id
+            patients.append(patient)
     return patients
 
-def search_patients(query: str, search_type: str, doctor_id: str) -> List[dict]:
-    all_patients = get_all_doctor_patients(doctor_id)
+SEARCH_FIELDS = {"name": "name", "id": "patient_number", "phone": "phone"}
+
+
+def search_patients(query: str, search_type: str, doctor_id: str,
+                    fields: Optional[Sequence[str]] = None) -> List[dict]:
+    if fields is not None and search_type in SEARCH_FIELDS:
+        fields = (*fields, SEARCH_FIELDS[search_type])
+    all_patients = get_all_doctor_patients(doctor_id, fields)
     query_stripped = query.strip()
     query_nospace = query_stripped.replace(" ", "").replace("-", "")
 
@@ -49,25 +83,51 @@ def search_patients(query: str, search_type: str, doctor_id: str) -> List[dict]:
         ]
     return []
 
-def create_patient(name: str, email: str, phone: str,
-                   date_of_birth: str, location: str,
-                   medical_history_summary: Optional[str] = None) -> dict:
+PATIENT_NUMBER_COUNTER = "counters/patient_number"
+
+
+def _max_patient_number() -> int:
+    # Only used once, to seed the counter on databases created before it existed
     all_patients = get_ref("patients").get() or {}
-    max_number = max((p.get("patient_number", 0) for p in all_patients.values()), default=0)
+    return max((p.get("patient_number", 0) for p in all_patients.values()), default=0)
+
+
+def allocate_patient_numbers(count: int = 1) -> range:
+    """
+    Reserve count consecutive patient numbers in one transaction.
+    Bulk imports can allocate a block up front and pass each number to
+    create_patient().
+    """
+    return allocate_block(PATIENT_NUMBER_COUNTER, count, seed=_max_patient_number)
+
 
+def create_patient(name: str, email: str, phone: str,
+                   date_of_birth: str, location: str,
+                   medical_history_summary: Optional[str] = None,
+                   patient_number: Optional[int] = None) -> dict:
+    """Raises account_index.AccountExistsError if the email or phone is taken."""
     patient_id = str(uuid.uuid4())
-    patient_data = {
-        "name": name,
-        "email": email,
-        "phone": phone,
-        "date_of_birth": date_of_birth,
-        "location": location,
-        "medical_history_summary": medical_history_summary,
-        "total_visits": 0,
-        "last_visit": None,
-        "is_active": True,
-        "patient_number": max_number + 1,
-    }
-    get_ref(f"patients/{patient_id}").set(patient_data)
+    account_index.reserve("patients", patient_id, email, phone)
+    try:
+        if patient_number is None:
+            patient_number = allocate_patient_numbers(1)[0]
+
+        patient_data = {
+            "name": name,
+            "email": email,
+            "phone": phone,
+            "date_of_birth": date_of_birth,
+            "location": location,
+            "medical_history_summary": medical_history_summary,
+            "total_visits": 0,
+            "last_visit": None,
+            "is_active": True,
+            "patient_number": patient_number,
+        }
+        get_ref(f"patients/{patient_id}").set(patient_data)
+    except Exception:
+        # Without the patient, the reservations would lock the email and phone out
+        account_index.release("patients", patient_id, email, phone)
+        raise
     patient_data["id"] = patient_id
     return patient_data
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Field projections for listing endpoints.
+
+Listing endpoints accept fields=name,phone,... to return only what the
+client renders. Each endpoint names the fields it can return; a projection
+can only narrow that set, so stored-only fields such as hashed_password are
+never reachable. The loaders in app.services.loader read a projection as
+per-field paths instead of whole objects; without one, whole objects are
+read, one path per item.
+"""
+from typing import Iterable, Optional, Tuple
+
+# Fields returned by the doctor listings (/patient-auth/doctors, /my-doctors)
+DOCTOR_LIST_FIELDS = ("name", "specialization", "hospital")
+DOCTOR_CONTACT_FIELDS = DOCTOR_LIST_FIELDS + ("phone", "email")
+
+# Fields of PatientResponse besides id
+PATIENT_FIELDS = (
+    "name", "email", "phone", "date_of_birth", "location",
+    "total_visits", "last_visit", "medical_history_summary",
+)
+
+DEFAULTS = {"total_visits": 0, "last_visit": None, "medical_history_summary": None}
+
+
+def parse_fields(value: Optional[str], allowed: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma-separated fields= parameter. None/empty means every allowed
+    field. "id" is always returned and may be listed. Raises ValueError on
+    fields the endpoint does not return.
+    """
+    if not value:
+        return None
+    allowed = tuple(allowed)
+    requested = [f.strip() for f in value.split(",") if f.strip() and f.strip() != "id"]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(dict.fromkeys(requested))
+
+
+def project(item_id: str, data: dict, fields: Iterable[str]) -> dict:
+    """{"id": item_id, field: value, ...} with the endpoint's defaults for missing fields."""
+    result = {"id": item_id}
+    for field in fields:
+        result[field] = data.get(field, DEFAULTS.get(field, ""))
+    return result
@@ -0,0 +1,253 @@
+"""
+Push of queue changes to subscribed clients (WebSocket and Server-Sent Events).
+
+queue_repository reports every change of a (doctor, date) queue: writes made
+by this process through book_token(), check_in_patient(),
+start_consultation(), complete_consultation() or a cancellation, and writes
+of other workers once the live mirror or a shard reload picks them up. The
+hub collects those changes, recomputes the views of the subscribers that
+follow an affected queue (positions and ETAs from one cached prediction pass
+per queue) and sends each subscriber only what changed since its last
+message:
+
+    {"type": "snapshot", "current_serving_token": ..., "entries": {id: {...}}}
+    {"type": "diff", "changed": {id: {field: value}}, "removed": [id, ...]}
+
+A subscription follows a patient's own active entries, across doctors, or a
+doctor's queue for today. Views are recomputed only when a queue changes, so
+a quiet queue costs nothing. Subscribed queues are also re-checked every
+QUEUE_PUSH_RESYNC_SECONDS, which picks up other workers' writes when the
+mirror is off (bounded by QUEUE_INDEX_TTL_SECONDS).
+"""
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import detached_context
+from app.services import name_snapshots, queue_repository, queue_service
+from app.services.queue_repository import ACTIVE_STATUSES
+
+PATIENT, DOCTOR = "patient", "doctor"
+BUFFERED_MESSAGES = 16
+
+
+class Subscription:
+    def __init__(self, kind: str, subject_id: str):
+        self.kind = kind
+        self.subject_id = subject_id
+        self.queues: Set[Tuple[str, str]] = set()
+        self.view: Optional[dict] = None
+        self.messages: asyncio.Queue = asyncio.Queue(maxsize=BUFFERED_MESSAGES)
+
+    def deliver(self, view: dict):
+        if self.view is None:
+            message = {"type": "snapshot", **view}
+        else:
+            message = diff(self.view, view)
+            if not message:
+                return
+        try:
+            self.messages.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client is not keeping up: drop what it has not read, resend everything
+            while not self.messages.empty():
+                self.messages.get_nowait()
+            message = {"type": "snapshot", **view}
+            self.messages.put_nowait(message)
+        self.view = view
+
+    async def next_message(self, timeout: float) -> Optional[dict]:
+        """The next message, or None if there is none within timeout."""
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def diff(old: dict, new: dict) -> dict:
+    """Diff message from view old to view new; {} if nothing changed."""
+    message = {k: v for k, v in new.items() if k != "entries" and old.get(k) != v}
+    changed = {}
+    for entry_id, entry in new["entries"].items():
+        before = old["entries"].get(entry_id, {})
+        fields = {k: v for k, v in entry.items() if before.get(k) != v}
+        if fields:
+            changed[entry_id] = fields
+    removed = sorted(set(old["entries"]) - set(new["entries"]))
+    if changed:
+        message["changed"] = changed
+    if removed:
+        message["removed"] = removed
+    return {"type": "diff", **message} if message else {}
+
+
+# ── Views ──────────────────────────────────────────────────────────────────────
+
+def _entry_view(entry: dict, prediction: dict) -> dict:
+    is_token = entry.get("booking_type", "token") == "token"
+    return {
+        "doctor_id": entry["doctor_id"],
+        "token_number": entry.get("token_number", 0),
+        "status": entry.get("status"),
+        "position_in_queue": prediction["patients_ahead"] + 1,
+        "estimated_minutes": prediction["estimated_minutes"] if is_token else None,
+        "estimated_time": prediction["estimated_time"] if is_token else None,
+    }
+
+
+def _serving_token(entries: List[dict]) -> int:
+    return next((e.get("token_number", 0) for e in entries if e.get("status") == "serving"), 0)
+
+
+def doctor_view(doctor_id: str) -> Tuple[dict, Set[Tuple[str, str]]]:
+    """(view, followed queues) of doctor_id's queue for today."""
+    today = queue_service.today_str()
+    entries = queue_repository.find_entries(doctor_id=doctor_id, date=today,
+                                            status=ACTIVE_STATUSES)
+    name_snapshots.fill_missing(entries)
+    predictions = queue_service.predict_entries(entries)
+    view = {
+        "date": today,
+        "current_serving_token": _serving_token(entries),
+        "entries": {
+            e["id"]: {**_entry_view(e, p), "patient_id": e["patient_id"],
+                      "patient_name": e.get("patient_name", "")}
+            for e, p in zip(entries, predictions)
+        },
+    }
+    return view, {(doctor_id, today)}
+
+
+def patient_view(patient_id: str) -> Tuple[dict, Set[Tuple[str, str]]]:
+    """(view, followed queues) of patient_id's active entries."""
+    entries = queue_service.get_all_active_queue_for_patient(patient_id)
+    name_snapshots.fill_missing(entries)
+    predictions = queue_service.predict_entries(entries)
+    queues = {(e["doctor_id"], e.get("date") or queue_service.today_str()) for e in entries}
+    serving = {}
+    for doctor_id, date in queues:
+        in_queue = queue_repository.find_entries(doctor_id=doctor_id, date=date, status="serving")
+        serving[doctor_id] = _serving_token(in_queue)
+    view = {
+        "entries": {
+            e["id"]: {**_entry_view(e, p), "doctor_name": e.get("doctor_name", ""),
+                      "current_serving_token": serving[e["doctor_id"]]}
+            for e, p in zip(entries, predictions)
+        },
+    }
+    return view, queues
+
+
+# ── Hub ────────────────────────────────────────────────────────────────────────
+
+class QueueHub:
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._changed_queues: Set[Tuple[str, str]] = set()
+        self._changed_patients: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._wake = asyncio.Event()
+        # The task outlives the request that starts it, and must not read
+        # through that request's cache (app.core.database.request_cache)
+        self._task = loop.create_task(self._run(), context=detached_context())
+        queue_repository.remove_listener(self._on_change)
+        queue_repository.add_listener(self._on_change)
+
+    def _on_change(self, doctor_id: str, date: str, patient_id: Optional[str]):
+        # Any thread, under the repository lock: hand off to the event loop
+        loop = self._loop
+        if loop is None or not self._subscriptions or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._mark, doctor_id, date, patient_id)
+
+    def _mark(self, doctor_id: str, date: str, patient_id: Optional[str]):
+        self._changed_queues.add((doctor_id, date))
+        if patient_id:
+            self._changed_patients.add(patient_id)
+        self._wake.set()
+
+    async def subscribe(self, kind: str, subject_id: str) -> Subscription:
+        """A subscription whose first message, the snapshot, is already queued."""
+        self._ensure_running()
+        subscription = Subscription(kind, subject_id)
+        self._subscriptions.add(subscription)
+        await self._refresh([subscription])
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.QUEUE_PUSH_RESYNC_SECONDS)
+            except asyncio.TimeoutError:
+                # Reloads any stale shard; a change found there comes back through _on_change
+                await run_in_threadpool(_recheck, list(self._subscriptions))
+                continue
+            self._wake.clear()
+            queues, self._changed_queues = self._changed_queues, set()
+            patients, self._changed_patients = self._changed_patients, set()
+            affected = [
+                s for s in self._subscriptions
+                if s.queues & queues or (s.kind == PATIENT and s.subject_id in patients)
+            ]
+            if affected:
+                try:
+                    await self._refresh(affected)
+                except Exception:
+                    # e.g. a database error: keep the hub alive, the next change retries
+                    pass
+
+    async def _refresh(self, subscriptions: List[Subscription]):
+        views = await run_in_threadpool(_compute_views, subscriptions)
+        for subscription, (view, queues) in zip(subscriptions, views):
+            subscription.queues = queues
+            subscription.deliver(view)
+
+    async def stop(self):
+        queue_repository.remove_listener(self._on_change)
+        if self._task is not None:
+            self._task.cancel()
+        self._task = self._loop = None
+        self._subscriptions.clear()
+
+
+def _compute_views(subscriptions: List[Subscription]) -> List[Tuple[dict, Set[Tuple[str, str]]]]:
+    # Subscribers of the same subject share one computation
+    computed: Dict[Tuple[str, str], Tuple[dict, Set[Tuple[str, str]]]] = {}
+    for s in subscriptions:
+        key = (s.kind, s.subject_id)
+        if key not in computed:
+            computed[key] = doctor_view(s.subject_id) if s.kind == DOCTOR else patient_view(s.subject_id)
+    return [computed[(s.kind, s.subject_id)] for s in subscriptions]
+
+
+def _recheck(subscriptions: List[Subscription]):
+    queues = set()
+    for s in subscriptions:
+        queues |= s.queues
+        if s.kind == PATIENT:
+            # Picks up the patient's bookings made by other workers
+            queue_repository.find_entries(patient_id=s.subject_id, status=ACTIVE_STATUSES)
+    for doctor_id, date in queues:
+        queue_repository.queue_version(doctor_id, date)
+
+
+_hub = QueueHub()
+
+
+def get_hub() -> QueueHub:
+    return _hub
+
+
+async def stop_hub():
+    await _hub.stop()
@@ -0,0 +1,92 @@
+"""
+Live in-process mirror of the queue driven by the database change stream.
+
+With QUEUE_MIRROR_ENABLED each worker subscribes once to the live queues/
+tree (Reference.listen). The initial snapshot and every subsequent put/patch
+event are applied to the queue repository's index, which then serves reads
+without polling the database.
+
+Staleness is bounded: a dead listener thread, or no full snapshot within
+QUEUE_MIRROR_MAX_STALENESS_SECONDS, makes the mirror reconnect, which
+delivers a fresh snapshot (resync). Until that arrives the repository falls
+back to its normal TTL reloads.
+"""
+import threading
+import time
+from typing import Optional
+from app.core.config import settings
+from app.core.database import get_ref
+from app.services import queue_repository
+
+
+class QueueMirror:
+    def __init__(self, max_staleness: float):
+        self._lock = threading.Lock()
+        self._registration = None
+        self._synced_at: Optional[float] = None
+        self._resyncing = False
+        self.max_staleness = max_staleness
+
+    def start(self):
+        with self._lock:
+            self._close()
+            self._registration = get_ref("queues").listen(self._on_event)
+            self._resyncing = False
+
+    def stop(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._registration is not None:
+            self._registration.close()
+            self._registration = None
+        self._synced_at = None
+
+    def _on_event(self, event):
+        queue_repository.apply_event(event.event_type, event.path, event.data)
+        if event.event_type == "put" and event.path == "/":
+            self._synced_at = time.monotonic()
+
+    def _listener_alive(self) -> bool:
+        # firebase_admin runs each listener on a private thread that exits
+        # when the stream breaks; the local backend has no thread.
+        thread = getattr(self._registration, "_thread", None)
+        return thread is None or thread.is_alive()
+
+    def is_fresh(self) -> bool:
+        if self._registration is None or self._synced_at is None:
+            return False
+        if (not self._listener_alive()
+                or time.monotonic() - self._synced_at > self.max_staleness):
+            self._resync()
+            return False
+        return True
+
+    def _resync(self):
+        with self._lock:
+            if self._resyncing:
+                return
+            self._resyncing = True
+            self._synced_at = None
+        threading.Thread(target=self.start, daemon=True).start()
+
+
+_mirror: Optional[QueueMirror] = None
+
+
+def start_queue_mirror() -> QueueMirror:
+    global _mirror
+    if _mirror is None:
+        _mirror = QueueMirror(settings.QUEUE_MIRROR_MAX_STALENESS_SECONDS)
+        queue_repository.attach_mirror(_mirror)
+    _mirror.start()
+    return _mirror
+
+
+def stop_queue_mirror():
+    global _mirror
+    if _mirror is not None:
+        _mirror.stop()
+        queue_repository.attach_mirror(None)
+        _mirror = None
@@ -0,0 +1,81 @@
+"""
+Order statistics over one queue, for O(log n) positions.
+
+QueueOrder counts a queue's entries by their queue_repository.order_key()
+(priority rank, token number): one Fenwick tree over token numbers per
+priority rank in use. The number of entries ahead of a key is the total of
+the better ranks plus a prefix sum in the key's own rank. Almost every queue
+has a single rank, so lookups and updates are O(log n) in the highest
+token of the day.
+"""
+from typing import Dict, Tuple
+
+
+class FenwickTree:
+    """Counts at non-negative integer positions with O(log n) prefix sums."""
+
+    def __init__(self, size: int = 64):
+        self._counts = [0] * size
+        self._tree = [0] * (size + 1)
+
+    def _grow(self, position: int):
+        size = len(self._counts)
+        while size <= position:
+            size *= 2
+        self._counts += [0] * (size - len(self._counts))
+        # Linear-time rebuild from the point counts
+        tree = [0] + self._counts
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def add(self, position: int, delta: int):
+        if position >= len(self._counts):
+            self._grow(position)
+        self._counts[position] += delta
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def count_below(self, position: int) -> int:
+        """Sum of the counts at positions < position."""
+        i = min(position, len(self._counts))
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+
+class QueueOrder:
+    def __init__(self):
+        self._ranks: Dict[int, FenwickTree] = {}
+        self._totals: Dict[int, int] = {}
+
+    def add(self, key: Tuple[int, int], delta: int = 1):
+        rank, token = key
+        tree = self._ranks.get(rank)
+        if tree is None:
+            tree = self._ranks[rank] = FenwickTree()
+        tree.add(max(0, token), delta)
+        self._totals[rank] = self._totals.get(rank, 0) + delta
+        if not self._totals[rank]:
+            del self._totals[rank], self._ranks[rank]
+
+    def remove(self, key: Tuple[int, int]):
+        self.add(key, -1)
+
+    def count_ahead(self, key: Tuple[int, int]) -> int:
+        """Number of counted keys strictly before key."""
+        rank, token = key
+        ahead = sum(total for r, total in self._totals.items() if r < rank)
+        tree = self._ranks.get(rank)
+        if tree is not None:
+            ahead += tree.count_below(max(0, token))
+        return ahead
+
+    def __len__(self) -> int:
+        return sum(self._totals.values())
@@ -0,0 +1,642 @@
+"""
+In-process indexed view of the live queue.
+
+Storage layout:
+    queues/{doctor_id}/{date}/{entry_id}     one shard per doctor per day
+    patient_queue/{patient_id}/{entry_id}    {"doctor_id", "date"} pointer to
+                                             each live entry of a patient
+
+Doctor-scoped lookups load only the (doctor, date) shard they need; patient
+lookups read the patient's pointers and load the shards they reference.
+Async handlers do those reads through app.core.async_database with
+aensure_shards() and afind_entries().
+Loaded entries are kept with secondary indexes by doctor_id, patient_id,
+status and date, updated in place by every write made through this module.
+Each (doctor, date) queue has a version that changes with its entries, for
+caches of values derived from a queue (see wait_predictor); listeners added
+with add_listener() are told about every such change (see queue_events).
+
+Checked-in ("waiting") entries of each queue are also kept in a heap ordered
+by order_key(): higher priority first, then token number. next_waiting()
+peeks it in O(log n); entries that leave the waiting state or change
+priority are dropped from it lazily, and the heap is compacted when stale
+keys outnumber live ones. Entries in the queue (waiting or serving) are
+counted in a QueueOrder per queue as well, so patients_ahead() is O(log n)
+instead of a scan of the shard. Like the rest of the index both are rebuilt
+from storage whenever a shard is (re)loaded.
+
+A shard is refreshed from the database after QUEUE_INDEX_TTL_SECONDS so that
+writes made by other workers are picked up, unless a live mirror (see
+app.services.queue_mirror) is attached and keeping the whole live tree
+current from the database change stream.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from app.core.config import settings
+from app.core.database import get_ref
+from app.core.async_database import aget_ref
+from app.services.loader import load_many
+from app.services.queue_order import QueueOrder
+
+ACTIVE_STATUSES = ("confirmed", "waiting", "serving")
+IN_QUEUE_STATUSES = ("waiting", "serving")  # checked in: counted for positions
+TERMINAL_STATUSES = ("completed", "cancelled", "expired")
+INDEXED_FIELDS = ("doctor_id", "patient_id", "status", "date")
+DEFAULT_PRIORITY = 0
+
+
+def order_key(entry: dict) -> Tuple[int, int]:
+    """Serving order within a queue: higher priority first, then lower token."""
+    return -int(entry.get("priority") or DEFAULT_PRIORITY), int(entry.get("token_number", 0))
+
+
+def shard_path(doctor_id: str, date: str) -> str:
+    return f"queues/{doctor_id}/{date}"
+
+
+class QueueIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[str, dict] = {}
+        self._indexes: Dict[str, Dict[object, Set[str]]] = {f: {} for f in INDEXED_FIELDS}
+        self._shards: Dict[Tuple[str, str], float] = {}
+        # Entry ids read from each shard, whatever fields the stored entries have
+        self._members: Dict[Tuple[str, str], Set[str]] = {}
+        self._versions: Dict[Tuple[str, str], int] = {}
+        # Waiting entries per queue: heap of (order key, entry_id), live keys by entry_id
+        self._waiting: Dict[Tuple[str, str], List[tuple]] = {}
+        self._waiting_keys: Dict[str, tuple] = {}
+        self._waiting_live: Dict[Tuple[str, str], int] = {}
+        self._in_queue: Dict[Tuple[str, str], QueueOrder] = {}
+        self._active: Dict[Tuple[str, str], int] = {}
+        self._mirror = None
+
+    # ── Loading ────────────────────────────────────────────────────────────
+    def attach_mirror(self, mirror):
+        """mirror.is_fresh() decides whether shard reloads can be skipped."""
+        self._mirror = mirror
+
+    def mirrored(self) -> bool:
+        return self._mirror is not None and self._mirror.is_fresh()
+
+    def needs_load(self, doctor_id: str, date: str, force: bool = False) -> bool:
+        if self.mirrored():
+            return False
+        loaded_at = self._shards.get((doctor_id, date))
+        ttl = settings.QUEUE_INDEX_TTL_SECONDS
+        return force or loaded_at is None or time.monotonic() - loaded_at >= ttl
+
+    def ensure_shard(self, doctor_id: str, date: str, force: bool = False):
+        if self.needs_load(doctor_id, date, force):
+            self.load_shard(doctor_id, date, get_ref(shard_path(doctor_id, date)).get() or {})
+
+    def load_shard(self, doctor_id: str, date: str, shard: dict):
+        with self._lock:
+            self._replace_shard(doctor_id, date, shard)
+            self._shards[(doctor_id, date)] = time.monotonic()
+
+    def _shard_entries(self, doctor_id: str, date: str) -> Set[str]:
+        indexed = self._lookup("doctor_id", doctor_id) & self._lookup("date", date)
+        loaded = self._members.get((doctor_id, date), set())
+        return indexed | {i for i in loaded if i in self._entries}
+
+    def _replace_shard(self, doctor_id: str, date: str, shard: dict):
+        stale = self._shard_entries(doctor_id, date)
+        fresh = {i: e for i, e in shard.items() if isinstance(e, dict)}
+        self._members[(doctor_id, date)] = set(fresh)
+        if {i: _stored(self._entries[i]) for i in stale} == {i: _stored(e) for i, e in fresh.items()}:
+            return  # unchanged: keep the shard's version
+        for entry_id in stale:
+            self._remove(entry_id)
+        for entry_id, entry in fresh.items():
+            self._add(entry_id, entry)
+        # Entries without doctor_id/date bump no version of their own
+        self._bump({"doctor_id": doctor_id, "date": date})
+
+    # ── Index maintenance ──────────────────────────────────────────────────
+    def _bump(self, entry: dict):
+        self._versions[(entry.get("doctor_id"), entry.get("date"))] = next(_version_counter)
+        for listener in list(_listeners):
+            listener(entry.get("doctor_id"), entry.get("date"), entry.get("patient_id"))
+
+    def version(self, doctor_id: str, date: str) -> int:
+        return self._versions.get((doctor_id, date), 0)
+
+    def _add(self, entry_id: str, entry: dict):
+        self._entries[entry_id] = entry
+        self._bump(entry)
+        for field in INDEXED_FIELDS:
+            self._indexes[field].setdefault(entry.get(field), set()).add(entry_id)
+        self._count(entry, 1)
+        if entry.get("status") == "waiting":
+            queue = (entry.get("doctor_id"), entry.get("date"))
+            key = (order_key(entry), entry_id)
+            self._waiting_keys[entry_id] = key
+            self._waiting_live[queue] = self._waiting_live.get(queue, 0) + 1
+            heap = self._waiting.setdefault(queue, [])
+            heapq.heappush(heap, key)
+            if len(heap) > 32 and len(heap) > 2 * self._waiting_live[queue]:
+                heap[:] = [k for k in heap if self._waiting_keys.get(k[1]) == k]
+                heapq.heapify(heap)
+
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        self._bump(entry)
+        self._count(entry, -1)
+        if self._waiting_keys.pop(entry_id, None) is not None:
+            self._waiting_live[(entry.get("doctor_id"), entry.get("date"))] -= 1
+        for field in INDEXED_FIELDS:
+            ids = self._indexes[field].get(entry.get(field))
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._indexes[field][entry.get(field)]
+
+    def _count(self, entry: dict, delta: int):
+        queue = (entry.get("doctor_id"), entry.get("date"))
+        status = entry.get("status")
+        if status in ACTIVE_STATUSES:
+            self._active[queue] = self._active.get(queue, 0) + delta
+            if not self._active[queue]:
+                del self._active[queue]
+        if status in IN_QUEUE_STATUSES:
+            order = self._in_queue.get(queue)
+            if order is None:
+                order = self._in_queue[queue] = QueueOrder()
+            order.add(order_key(entry), delta)
+            if not len(order):
+                del self._in_queue[queue]
+
+    def put(self, entry_id: str, entry: Optional[dict]):
+        with self._lock:
+            self._remove(entry_id)
+            if entry is not None:
+                self._add(entry_id, dict(entry))
+
+    def patch(self, entry_id: str, changes: dict):
+        with self._lock:
+            current = self._entries.get(entry_id)
+            if current is None:
+                return
+            merged = {**current, **changes}
+            self._remove(entry_id)
+            self._add(entry_id, merged)
+
+    def apply_event(self, event_type: str, path: str, data):
+        """
+        Apply a change-stream event relative to queues/.
+        "put" replaces the value at path, "patch" merges data's keys into it.
+        A put at the root is a full snapshot (sent on every (re)connect).
+        """
+        parts = [p for p in path.split("/") if p]
+        if event_type == "patch":
+            for key, value in (data or {}).items():
+                self.apply_event("put", "/".join(parts + [key]), value)
+            return
+        if event_type != "put":
+            return
+        with self._lock:
+            if len(parts) > 3:
+                entry_id = parts[2]
+                entry = dict(self._entries.get(entry_id, {}))
+                _set_path(entry, parts[3:], data)
+                self.put(entry_id, entry or None)
+                return
+            # Replace everything under the doctor / shard / entry prefix
+            if len(parts) == 3:
+                stale = {parts[2]}
+            elif len(parts) == 2:
+                stale = self._shard_entries(parts[0], parts[1])
+            elif len(parts) == 1:
+                stale = self._lookup("doctor_id", parts[0])
+            else:
+                stale = set(self._entries)
+            for entry_id in stale:
+                self._remove(entry_id)
+            for entry_id, entry in _flatten_entries(data, 3 - len(parts), parts):
+                self._add(entry_id, entry)
+
+    # ── Lookups ────────────────────────────────────────────────────────────
+    def find(self, **filters) -> List[dict]:
+        """
+        Return copies of the loaded entries matching every filter.
+        A filter value may be a single value or a list/tuple/set of values.
+        Candidates come from the smallest matching index bucket.
+        """
+        with self._lock:
+            candidates: Optional[Set[str]] = None
+            for field, wanted in filters.items():
+                if wanted is None:
+                    continue
+                ids = self._lookup(field, wanted)
+                if candidates is None or len(ids) < len(candidates):
+                    candidates = ids
+            if candidates is None:
+                candidates = set(self._entries)
+
+            results = []
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if all(_matches(entry.get(f), w) for f, w in filters.items() if w is not None):
+                    results.append(_copy(entry_id, entry))
+            return results
+
+    def has(self, entry_id: str) -> bool:
+        return entry_id in self._entries
+
+    def count_ahead(self, doctor_id: str, date: str, keys: List[Tuple[int, int]]) -> List[int]:
+        with self._lock:
+            order = self._in_queue.get((doctor_id, date))
+            return [order.count_ahead(k) if order else 0 for k in keys]
+
+    def count_active(self, doctor_id: str, date: str) -> int:
+        return self._active.get((doctor_id, date), 0)
+
+    def peek_waiting(self, doctor_id: str, date: str) -> Optional[dict]:
+        """Copy of the first waiting entry of the queue in order_key() order."""
+        with self._lock:
+            heap = self._waiting.get((doctor_id, date))
+            while heap and self._waiting_keys.get(heap[0][1]) != heap[0]:
+                heapq.heappop(heap)
+            if not heap:
+                return None
+            entry_id = heap[0][1]
+            return _copy(entry_id, self._entries[entry_id])
+
+    def _lookup(self, field: str, wanted) -> Set[str]:
+        index = self._indexes[field]
+        if isinstance(wanted, (list, tuple, set, frozenset)):
+            ids: Set[str] = set()
+            for value in wanted:
+                ids |= index.get(value, set())
+            return ids
+        return set(index.get(wanted, ()))
+
+
+def _flatten_entries(data, depth: int, parts: List[str]):
+    """Yield (entry_id, entry) from a subtree depth levels above the entries."""
+    if not isinstance(data, dict):
+        return
+    if depth == 0:
+        yield parts[-1], data
+        return
+    for key, child in data.items():
+        yield from _flatten_entries(child, depth - 1, parts + [key])
+
+
+def _matches(value, wanted) -> bool:
+    if isinstance(wanted, (list, tuple, set, frozenset)):
+        return value in wanted
+    return value == wanted
+
+
+def _set_path(node: dict, parts: List[str], value):
+    for part in parts[:-1]:
+        child = node.get(part)
+        child = dict(child) if isinstance(child, dict) else {}
+        node[part] = child
+        node = child
+    if value is None:
+        node.pop(parts[-1], None)
+    else:
+        node[parts[-1]] = value
+
+
+def _stored(entry: dict) -> dict:
+    """entry as the database stores it (None fields are not stored)."""
+    return {k: v for k, v in entry.items() if v is not None}
+
+
+def _copy(entry_id: str, entry: dict) -> dict:
+    result = dict(entry)
+    result["id"] = entry_id
+    return result
+
+
+_version_counter = itertools.count(1)
+_listeners: List[Callable[[str, str, Optional[str]], None]] = []
+_index = QueueIndex()
+
+
+# ── Public API ─────────────────────────────────────────────────────────────────
+
+def find_entries(doctor_id: Optional[str] = None,
+                 patient_id: Optional[str] = None,
+                 status: Union[str, Iterable[str], None] = None,
+                 date: Optional[str] = None) -> List[dict]:
+    """
+    Entries matching all given filters, sorted by token_number.
+    Needs either patient_id (any doctor/date) or doctor_id plus date (one shard).
+    """
+    if status is not None and not isinstance(status, str):
+        status = tuple(status)
+
+    pointed = None
+    if patient_id is not None:
+        pointed = _load_patient_shards(patient_id, doctor_id, date)
+    elif doctor_id is not None and date is not None:
+        _index.ensure_shard(doctor_id, date)
+    else:
+        raise ValueError("find_entries needs patient_id, or doctor_id and date")
+
+    entries = _index.find(doctor_id=doctor_id, patient_id=patient_id,
+                          status=status, date=date)
+    if pointed is not None:
+        # A cached shard may still hold entries archived since; the pointers are current
+        entries = [e for e in entries if e["id"] in pointed]
+    entries.sort(key=lambda e: e.get("token_number", 0))
+    return entries
+
+
+def find_doctor_entries(doctor_id: str) -> List[dict]:
+    """Live entries of doctor_id on every date that has a shard."""
+    dates = get_ref(f"queues/{doctor_id}").get(shallow=True) or {}
+    entries = []
+    for date in dates:
+        entries += find_entries(doctor_id=doctor_id, date=date)
+    return entries
+
+
+def _load_patient_shards(patient_id: str, doctor_id: Optional[str],
+                         date: Optional[str]) -> Optional[Set[str]]:
+    """Ids of the patient's live entries as just read, or None if the mirror is trusted."""
+    if _index.mirrored():
+        return None
+    pointers = get_ref(f"patient_queue/{patient_id}").get() or {}
+    _load_pointed_shards(pointers, doctor_id, date)
+    return set(pointers)
+
+
+def _load_pointed_shards(pointers: dict, doctor_id: Optional[str] = None,
+                         date: Optional[str] = None):
+    for entry_id, pointer in pointers.items():
+        if not isinstance(pointer, dict):
+            continue
+        shard = (pointer.get("doctor_id"), pointer.get("date"))
+        if doctor_id is not None and shard[0] != doctor_id:
+            continue
+        if date is not None and shard[1] != date:
+            continue
+        _index.ensure_shard(*shard)
+        if not _index.has(entry_id):
+            # The cached shard predates this entry
+            _index.ensure_shard(*shard, force=True)
+
+
+def find_patients_entries(patient_ids: Iterable[str],
+                          status: Union[str, Iterable[str], None] = None) -> Dict[str, List[dict]]:
+    """
+    find_entries(patient_id=...) for many patients at once: their pointers
+    are fetched concurrently and each referenced shard is loaded once.
+    """
+    patient_ids = [p for p in dict.fromkeys(patient_ids) if p]
+    if status is not None and not isinstance(status, str):
+        status = tuple(status)
+    pointed = None
+    if not _index.mirrored():
+        pointed = load_many("patient_queue", patient_ids)
+        for pointers in pointed.values():
+            _load_pointed_shards(pointers)
+    result = {}
+    for patient_id in patient_ids:
+        entries = _index.find(patient_id=patient_id, status=status)
+        if pointed is not None:
+            entries = [e for e in entries if e["id"] in pointed.get(patient_id, {})]
+        entries.sort(key=lambda e: e.get("token_number", 0))
+        result[patient_id] = entries
+    return result
+
+
+async def aensure_shards(shards: Iterable[Tuple[str, str]], force: bool = False):
+    """Load the (doctor_id, date) shards that are due, read concurrently through app.core.async_database."""
+    wanted = [s for s in dict.fromkeys(shards) if _index.needs_load(*s, force=force)]
+    values = await asyncio.gather(*(aget_ref(shard_path(*s)).get() for s in wanted))
+    for (doctor_id, date), shard in zip(wanted, values):
+        _index.load_shard(doctor_id, date, shard or {})
+
+
+async def afind_entries(patient_id: str,
+                        status: Union[str, Iterable[str], None] = None) -> List[dict]:
+    """
+    find_entries(patient_id=..., status=...) for async handlers: the pointers
+    and the shards they reference are read concurrently, without a worker thread.
+    """
+    if status is not None and not isinstance(status, str):
+        status = tuple(status)
+    pointed = None
+    if not _index.mirrored():
+        pointers = await aget_ref(f"patient_queue/{patient_id}").get() or {}
+        pointers = {i: p for i, p in pointers.items() if isinstance(p, dict)}
+        await aensure_shards((p.get("doctor_id"), p.get("date")) for p in pointers.values())
+        # A cached shard that predates one of the entries is read again
+        await aensure_shards(((p.get("doctor_id"), p.get("date"))
+                             for i, p in pointers.items() if not _index.has(i)), force=True)
+        pointed = set(pointers)
+    entries = _index.find(patient_id=patient_id, status=status)
+    if pointed is not None:
+        entries = [e for e in entries if e["id"] in pointed]
+    entries.sort(key=lambda e: e.get("token_number", 0))
+    return entries
+
+
+def queue_version(doctor_id: str, date: str) -> int:
+    """
+    Changes whenever an entry of the (doctor_id, date) queue is added,
+    changed or removed, by this process or (after a reload or mirror event)
+    by another one. Values are never reused.
+    """
+    _index.ensure_shard(doctor_id, date)
+    return _index.version(doctor_id, date)
+
+
+def patients_ahead(doctor_id: str, date: str, entries: List[dict]) -> List[int]:
+    """
+    For each entry, how many checked-in entries (waiting or serving) of the
+    (doctor_id, date) queue come before it in order_key() order; O(log n) each.
+    """
+    _index.ensure_shard(doctor_id, date)
+    return _index.count_ahead(doctor_id, date, [order_key(e) for e in entries])
+
+
+def count_active(doctor_id: str, date: str) -> int:
+    """Number of active (confirmed, waiting or serving) entries of the queue."""
+    _index.ensure_shard(doctor_id, date)
+    return _index.count_active(doctor_id, date)
+
+
+def next_waiting(doctor_id: str, date: str) -> Optional[dict]:
+    """The checked-in entry of the (doctor_id, date) queue to be served next."""
+    _index.ensure_shard(doctor_id, date)
+    return _index.peek_waiting(doctor_id, date)
+
+
+def refresh_shard(doctor_id: str, date: str):
+    """Reload the (doctor_id, date) shard now, e.g. after losing a claim to another worker."""
+    if not _index.mirrored():
+        _index.ensure_shard(doctor_id, date, force=True)
+
+
+def max_token_number(doctor_id: str, date: str) -> int:
+    """Highest token handed out by doctor_id on date, live or archived."""
+    tokens = [e.get("token_number", 0) for e in find_entries(doctor_id=doctor_id, date=date)]
+    history = get_ref(f"queue_history/{date}").get() or {}
+    tokens += [
+        e.get("token_number", 0) for e in history.values()
+        if isinstance(e, dict) and e.get("doctor_id") == doctor_id
+    ]
+    return max(tokens, default=0)
+
+
+def _pointer(entry: dict) -> dict:
+    return {"doctor_id": entry["doctor_id"], "date": entry["date"]}
+
+
+def insert_entry(entry_id: str, data: dict):
+    get_ref("/").update({
+        f"{shard_path(data['doctor_id'], data['date'])}/{entry_id}": data,
+        f"patient_queue/{data['patient_id']}/{entry_id}": _pointer(data),
+    })
+    _index.put(entry_id, data)
+
+
+class _NotClaimable(Exception):
+    """Aborts an entry transaction; the entry is gone or no longer in the expected state."""
+
+
+def claim_entry(entry: dict, expected_status: str, changes: dict) -> Optional[dict]:
+    """
+    Apply changes to entry only if its stored status is still expected_status,
+    checked and written in one database transaction so that concurrent
+    callers (in any worker) cannot both claim it. Returns the updated entry,
+    or None if it had already moved on (or been archived).
+    """
+    entry_id = entry["id"]
+    seen = []
+
+    def swap(current):
+        seen[:] = [current]  # the transaction function may run more than once
+        if not isinstance(current, dict) or current.get("status") != expected_status:
+            # Writing current back would fail for a deleted entry (None); abort instead
+            raise _NotClaimable()
+        return {**current, **changes}
+
+    try:
+        result = get_ref(f"{shard_path(entry['doctor_id'], entry['date'])}/{entry_id}").transaction(swap)
+    except _NotClaimable:
+        # Catch the index up with whatever happened to the entry meanwhile
+        current = seen[0] if seen else None
+        _index.put(entry_id, current if isinstance(current, dict) else None)
+        return None
+    _index.put(entry_id, result)
+    return _copy(entry_id, result)
+
+
+def update_entry(entry: dict, changes: dict) -> Optional[dict]:
+    """
+    Apply changes to entry in a transaction that skips it if it has been
+    archived meanwhile: a plain write to its fields would recreate it in the
+    queue as a partial entry. Returns the updated entry, or None if it is gone.
+    """
+    entry_id = entry["id"]
+
+    def patch(current):
+        if not isinstance(current, dict):
+            raise _NotClaimable()
+        return {**current, **changes}
+
+    try:
+        result = get_ref(f"{shard_path(entry['doctor_id'], entry['date'])}/{entry_id}").transaction(patch)
+    except _NotClaimable:
+        _index.put(entry_id, None)
+        return None
+    _index.put(entry_id, result)
+    return _copy(entry_id, result)
+
+
+def update_entries(entries: List[dict], changes: dict):
+    """Apply the same changes to several entries with update_entry(); archived ones are skipped."""
+    for entry in entries:
+        update_entry(entry, changes)
+
+
+def _archive_updates(entries: Dict[str, dict]) -> dict:
+    updates = {}
+    for entry_id, entry in entries.items():
+        data = {k: v for k, v in entry.items() if k != "id"}
+        date = data.get("date") or "undated"
+        updates[f"{shard_path(data['doctor_id'], date)}/{entry_id}"] = None
+        updates[f"patient_queue/{data['patient_id']}/{entry_id}"] = None
+        updates[f"queue_history/{date}/{entry_id}"] = data
+    return updates
+
+
+def archive_entries(entries: Dict[str, dict]):
+    """
+    Move finished entries from their queue shard to queue_history/{date}/{id}
+    and drop their patient pointers, in a single multi-path update.
+    """
+    updates = _archive_updates(entries)
+    if not updates:
+        return
+    get_ref("/").update(updates)
+    for entry_id in entries:
+        _index.put(entry_id, None)
+
+
+def apply_batch(changes: List[Tuple[dict, dict]], archived: Dict[str, dict]):
+    """
+    Per-entry changes ([(entry, changes)]) and archived entries (as for
+    archive_entries()) written together in one multi-path update.
+    """
+    updates = _archive_updates(archived)
+    for entry, fields in changes:
+        base = f"{shard_path(entry['doctor_id'], entry['date'])}/{entry['id']}"
+        updates.update({f"{base}/{field}": value for field, value in fields.items()})
+    if not updates:
+        return
+    get_ref("/").update(updates)
+    for entry, fields in changes:
+        _index.patch(entry["id"], fields)
+    for entry_id in archived:
+        _index.put(entry_id, None)
+
+
+def archive_entry(entry: dict, changes: dict):
+    """Apply the final status change to entry and move it to queue_history."""
+    archive_entries({entry["id"]: {**entry, **changes}})
+
+
+def reset():
+    """Forget every loaded entry (e.g. after switching databases)."""
+    global _index
+    mirror = _index._mirror
+    _index = QueueIndex()
+    _index.attach_mirror(mirror)
+
+
+def apply_event(event_type: str, path: str, data):
+    _index.apply_event(event_type, path, data)
+
+
+def attach_mirror(mirror):
+    _index.attach_mirror(mirror)
+
+
+def add_listener(listener: Callable[[str, str, Optional[str]], None]):
+    """
+    Call listener(doctor_id, date, patient_id) whenever an entry of a queue is
+    added, changed or removed. It runs under the index lock, on whichever
+    thread made the change, so it must only hand the event off.
+    """
+    _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[str, str, Optional[str]], None]):
+    if listener in _listeners:
+        _listeners.remove(listener)
@@ -1,98 +1,80 @@
-from typing import List, Optional
-from app.core.database import get_ref
+from typing import Callable, List, Optional, Set, Tuple
+from app.services import queue_repository
+from app.services import name_snapshots
+from app.services.counters import next_value
+from app.services import duration_stats
+from app.services import wait_predictor
+from app.services.queue_repository import ACTIVE_STATUSES
 from datetime import datetime, timedelta, timezone
 import uuid
-import random
-import statistics
 
-DEFAULT_AVG_DURATION = 15
-PEAK_HOURS = [9, 10, 11, 14, 15, 16]
+
+CALL_NEXT_ATTEMPTS = 5
+
+_clock: Optional[Callable[[], datetime]] = None
 
 
 def now_utc() -> datetime:
     """Always return timezone-aware UTC time."""
+    if _clock is not None:
+        return _clock()
     return datetime.now(timezone.utc)
 
 
+def set_clock(clock: Optional[Callable[[], datetime]]):
+    """Replace the service clock (replays and simulations); None restores real time."""
+    global _clock
+    _clock = clock
+
+
 def get_active_queue_for_patient(patient_id: str) -> Optional[dict]:
-    all_entries = get_ref("queue_entries").get() or {}
-    for entry_id, entry in all_entries.items():
-        if (entry.get("patient_id") == patient_id and
-                entry.get("status") in ["confirmed", "waiting", "serving"]):
-            entry["id"] = entry_id
-            return entry
-    return None
+    entries = queue_repository.find_entries(patient_id=patient_id, status=ACTIVE_STATUSES)
+    return entries[0] if entries else None
 
 
 def get_all_active_queue_for_patient(patient_id: str) -> List[dict]:
     """Returns ALL active queue entries for a patient across all doctors."""
-    all_entries = get_ref("queue_entries").get() or {}
-    results = []
-    for entry_id, entry in all_entries.items():
-        if (entry.get("patient_id") == patient_id and
-                entry.get("status") in ["confirmed", "waiting", "serving"]):
-            entry["id"] = entry_id
-            results.append(entry)
-    return results
+    return queue_repository.find_entries(patient_id=patient_id, status=ACTIVE_STATUSES)
 
 
 def get_active_queue_for_patient_and_doctor(patient_id: str, doctor_id: str) -> Optional[dict]:
     """Check if patient already has active token with this specific doctor."""
-    all_entries = get_ref("queue_entries").get() or {}
-    for entry_id, entry in all_entries.items():
-        if (entry.get("patient_id") == patient_id and
-                entry.get("doctor_id") == doctor_id and
-                entry.get("status") in ["confirmed", "waiting", "serving"]):
-            entry["id"] = entry_id
-            return entry
-    return None
+    entries = queue_repository.find_entries(patient_id=patient_id, doctor_id=doctor_id,
+                                            status=ACTIVE_STATUSES)
+    return entries[0] if entries else None
+
+
+def timestamp() -> str:
+    """now_utc() in the format stored on queue entries (check-in, cancellation, ...)."""
+    return now_utc().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def today_str() -> str:
+    return now_utc().date().isoformat()
 
 
 def get_current_serving_token(doctor_id: str) -> int:
-    all_entries = get_ref("queue_entries").get() or {}
-    for entry in all_entries.values():
-        if entry.get("doctor_id") == doctor_id and entry.get("status") == "serving":
-            return entry.get("token_number", 0)
-    return 0
+    serving = queue_repository.find_entries(doctor_id=doctor_id, date=today_str(),
+                                            status="serving")
+    return serving[0].get("token_number", 0) if serving else 0
 
 
 def get_next_token_number(doctor_id: str) -> int:
-    today = now_utc().date().isoformat()
-    all_entries = get_ref("queue_entries").get() or {}
-    tokens = [
-        e.get("token_number", 0)
-        for e in all_entries.values()
-        if e.get("doctor_id") == doctor_id and e.get("date") == today
-    ]
-    return max(tokens) + 1 if tokens else 1
+    """
+    Allocate the next token for today from token_counters/{doctor_id}/{date}.
+    The counter is incremented in a transaction, so parallel bookings for the
+    same doctor never share a token number.
+    """
+    today = today_str()
+    return next_value(
+        f"token_counters/{doctor_id}/{today}",
+        seed=lambda: queue_repository.max_token_number(doctor_id, today),
+    )
 
 
 def calculate_position(entry: dict) -> int:
-    all_entries = get_ref("queue_entries").get() or {}
-    ahead = sum(
-        1 for e in all_entries.values()
-        if (e.get("doctor_id") == entry["doctor_id"] and
-            e.get("status") in ["waiting", "serving"] and
-            e.get("token_number", 0) < entry.get("token_number", 0))
-    )
-    return ahead + 1
-
-
-def get_historical_avg_duration(doctor_id: str) -> float:
-    """AI: Calculate predicted avg consultation duration from historical data."""
-    all_entries = get_ref("queue_entries").get() or {}
-    durations = [
-        e.get("actual_duration")
-        for e in all_entries.values()
-        if e.get("doctor_id") == doctor_id
-        and e.get("actual_duration") is not None
-        and isinstance(e.get("actual_duration"), (int, float))
-        and 2 <= e.get("actual_duration", 0) <= 120
-    ]
-    if len(durations) >= 3:
-        avg = statistics.median(durations)
-        return max(5.0, min(60.0, avg))
-    return float(DEFAULT_AVG_DURATION)
+    date = entry.get("date") or today_str()
+    return queue_repository.patients_ahead(entry["doctor_id"], date, [entry])[0] + 1
 
 
 def ai_predict_wait_time(entry: dict) -> dict:
@@ -102,69 +84,32 @@ def ai_predict_wait_time(entry: dict) -> dict:
     2. Peak hour multiplier
     3. Day-of-week patterns
     4. Queue depth weighting
+    See wait_predictor.predict_wait_times() for scoring many entries at once.
     """
-    doctor_id = entry["doctor_id"]
-    position = calculate_position(entry)
-    patients_ahead = position - 1
+    return predict_entries([entry])[0]
 
-    avg_duration = get_historical_avg_duration(doctor_id)
 
+def predict_entries(entries: List[dict]) -> List[dict]:
+    """
+    ai_predict_wait_time() for many entries: one batch per (doctor, date)
+    queue instead of one full recomputation per entry, served from the
+    prediction cache while the queue is unchanged.
+    """
     now = now_utc()
-    hour = now.hour
-    day_of_week = now.weekday()
-
-    if hour in PEAK_HOURS:
-        time_multiplier = 1.3
-    elif hour in [12, 13]:
-        time_multiplier = 0.85
-    else:
-        time_multiplier = 1.0
-
-    if day_of_week in [0, 4]:
-        day_multiplier = 1.1
-    elif day_of_week == 5:
-        day_multiplier = 1.2
-    else:
-        day_multiplier = 1.0
-
-    all_entries = get_ref("queue_entries").get() or {}
-    today = now.date().isoformat()
-    total_today = sum(
-        1 for e in all_entries.values()
-        if e.get("doctor_id") == doctor_id
-        and e.get("date") == today
-        and e.get("status") in ["waiting", "serving", "confirmed"]
-    )
-    depth_factor = 1.0 + (min(total_today, 20) * 0.01)
-
-    base_estimate = patients_ahead * avg_duration
-    ai_estimate = base_estimate * time_multiplier * day_multiplier * depth_factor
-    uncertainty = ai_estimate * random.uniform(-0.05, 0.08)
-    final_estimate = max(0, int(ai_estimate + uncertainty))
-
-    all_durations_count = sum(
-        1 for e in all_entries.values()
-        if e.get("doctor_id") == doctor_id and e.get("actual_duration") is not None
-    )
-    confidence = min(95, 60 + (all_durations_count * 2))
-
-    estimated_dt = now + timedelta(minutes=final_estimate)
-    estimated_time_str = estimated_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-    return {
-        "estimated_minutes": final_estimate,
-        "estimated_time": estimated_time_str,
-        "consultation_duration": int(avg_duration),
-        "patients_ahead": patients_ahead,
-        "confidence_percent": confidence,
-        "peak_hour": hour in PEAK_HOURS,
-        "ai_factors": {
-            "historical_avg_mins": round(avg_duration, 1),
-            "time_multiplier": time_multiplier,
-            "day_multiplier": day_multiplier,
-            "depth_factor": round(depth_factor, 2),
-        }
-    }
+    predictions = []
+    queues: dict = {}
+    for entry in entries:
+        key = (entry["doctor_id"], entry.get("date") or today_str())
+        if key not in queues:
+            queues[key] = wait_predictor.queue_predictions(key[0], now, key[1])
+        prediction = queues[key].get(entry.get("id"))
+        if prediction is None:
+            # Not an active entry of its queue (e.g. already finished)
+            prediction = wait_predictor.predict_wait_times(
+                key[0], [entry], now.replace(second=0, microsecond=0), key[1]
+            )[0]
+        predictions.append(prediction)
+    return predictions
 
 
 def estimate_wait_time(entry: dict) -> dict:
@@ -194,8 +139,9 @@ def book_token(patient_id: str, doctor_id: str) -> dict:
         "consultation_end_time": None,
         "actual_duration": None,
         "date": today,
+        **name_snapshots.snapshot(doctor_id, patient_id),
     }
-    get_ref(f"queue_entries/{entry_id}").set(entry_data)
+    queue_repository.insert_entry(entry_id, entry_data)
     entry_data["id"] = entry_id
 
     ai_prediction = ai_predict_wait_time(entry_data)
@@ -244,19 +190,18 @@ def book_multi_doctor_token(patient_id: str, doctor_ids: List[str], slot_duratio
             "consultation_end_time": None,
             "actual_duration": None,
             "date": today,
+            **name_snapshots.snapshot(doctor_id, patient_id),
         }
-        get_ref(f"queue_entries/{entry_id}").set(entry_data)
+        queue_repository.insert_entry(entry_id, entry_data)
         entry_data["id"] = entry_id
 
         prediction = ai_predict_wait_time(entry_data)
-        doctor = get_ref(f"doctors/{doctor_id}").get() or {}
-        patient = get_ref(f"patients/{patient_id}").get() or {}
 
         results.append({
             "already_exists": False,
             "doctor_id": doctor_id,
-            "doctor_name": doctor.get("name", ""),
-            "patient_name": patient.get("name", ""),
+            "doctor_name": entry_data["doctor_name"],
+            "patient_name": entry_data["patient_name"],
             "token_number": token,
             "status": "confirmed",
             "ai_prediction": {
@@ -297,8 +242,9 @@ def create_queue_entry(patient_id: str, doctor_id: str, appointment_time: dateti
         "consultation_end_time": None,
         "actual_duration": None,
         "date": today,
+        **name_snapshots.snapshot(doctor_id, patient_id),
     }
-    get_ref(f"queue_entries/{entry_id}").set(entry_data)
+    queue_repository.insert_entry(entry_id, entry_data)
     entry_data["id"] = entry_id
     return entry_data
 
@@ -307,66 +253,138 @@ def check_in_patient(patient_id: str) -> Optional[dict]:
     entry = get_active_queue_for_patient(patient_id)
     if not entry:
         return None
-    get_ref(f"queue_entries/{entry['id']}").update({
+    return queue_repository.update_entry(entry, {
         "status": "waiting",
         "check_in_time": now_utc().strftime("%Y-%m-%dT%H:%M:%SZ"),
     })
-    entry["status"] = "waiting"
-    return entry
+
+
+def apply_bulk(items: List[dict], actor_id: str) -> List[dict]:
+    """
+    Check in or cancel many patients at once (reception kiosks). Items are
+    {"patient_id", "entry_id" (optional), "action": "check_in" | "cancel"}.
+    actor_id may only change entries it is the doctor or the patient of.
+    All items are resolved against one load of the patients' active entries
+    and every change is written in a single multi-path update. Returns one
+    result per item, in order; a failed item does not stop the others.
+    """
+    stamp = timestamp()
+    entries = queue_repository.find_patients_entries((i["patient_id"] for i in items),
+                                                     status=ACTIVE_STATUSES)
+    changes, archived, results = [], {}, []
+    taken: Set[str] = set()
+    for item in items:
+        result = {"patient_id": item["patient_id"], "entry_id": item.get("entry_id"),
+                  "action": item["action"]}
+        entry, error = _bulk_target(entries.get(item["patient_id"], []), item, taken, actor_id)
+        if entry is None:
+            results.append({**result, "success": False, "error": error})
+            continue
+        taken.add(entry["id"])
+        if item["action"] == "check_in":
+            changes.append((entry, {"status": "waiting", "check_in_time": stamp}))
+            status = "waiting"
+        else:
+            archived[entry["id"]] = {**entry, "status": "cancelled", "cancelled_at": stamp}
+            status = "cancelled"
+        results.append({**result, "success": True, "entry_id": entry["id"],
+                        "doctor_id": entry["doctor_id"], "token_number": entry["token_number"],
+                        "status": status})
+    queue_repository.apply_batch(changes, archived)
+    return results
+
+
+def _bulk_target(entries: List[dict], item: dict, taken: Set[str],
+                 actor_id: str) -> Tuple[Optional[dict], Optional[str]]:
+    """(entry the item applies to, None) or (None, error)."""
+    entries = [e for e in entries if e["id"] not in taken]
+    if item.get("entry_id"):
+        entries = [e for e in entries if e["id"] == item["entry_id"]]
+    if not entries:
+        return None, "No active queue entry"
+    entries = [e for e in entries if actor_id in (e.get("doctor_id"), e.get("patient_id"))]
+    if not entries:
+        return None, "Not allowed to change this booking"
+    if item["action"] == "check_in":
+        ready = [e for e in entries if e.get("status") == "confirmed"]
+        return (ready[0], None) if ready else (None, "Already checked in")
+    ready = [e for e in entries if e.get("status") != "serving"]
+    if not ready:
+        return None, "Cannot cancel — consultation is already in progress"
+    return ready[0], None
 
 
 def start_consultation(patient_id: str, doctor_id: str) -> Optional[dict]:
-    all_entries = get_ref("queue_entries").get() or {}
-    for entry_id, entry in all_entries.items():
-        if (entry.get("patient_id") == patient_id and
-                entry.get("doctor_id") == doctor_id and
-                entry.get("status") == "waiting"):
-            get_ref(f"queue_entries/{entry_id}").update({
-                "status": "serving",
-                "consultation_start_time": now_utc().strftime("%Y-%m-%dT%H:%M:%SZ"),
-            })
-            entry["id"] = entry_id
-            entry["status"] = "serving"
-            return entry
+    waiting = queue_repository.find_entries(patient_id=patient_id, doctor_id=doctor_id,
+                                            status="waiting")
+    if not waiting:
+        return None
+    return _start(waiting[0])
+
+
+def _start(entry: dict) -> Optional[dict]:
+    # Claimed in a transaction, so call_next() and a manual start never both win
+    return queue_repository.claim_entry(entry, "waiting", {
+        "status": "serving",
+        "consultation_start_time": now_utc().strftime("%Y-%m-%dT%H:%M:%SZ"),
+    })
+
+
+def call_next(doctor_id: str) -> Optional[dict]:
+    """
+    Move the doctor's next checked-in entry for today (highest priority, then
+    lowest token) to serving and return it; None if nobody is waiting.
+    An entry claimed by another request or worker first is skipped.
+    """
+    today = today_str()
+    for _ in range(CALL_NEXT_ATTEMPTS):
+        entry = queue_repository.next_waiting(doctor_id, today)
+        if entry is None:
+            return None
+        started = _start(entry)
+        if started is not None:
+            return started
+        queue_repository.refresh_shard(doctor_id, today)
     return None
 
 
+def set_priority(patient_id: str, doctor_id: str, priority: int) -> Optional[dict]:
+    """Reorder the patient's active entry with doctor_id; higher priority is served first."""
+    entry = get_active_queue_for_patient_and_doctor(patient_id, doctor_id)
+    if not entry:
+        return None
+    return queue_repository.update_entry(entry, {"priority": priority})
+
+
 def complete_consultation(patient_id: str, doctor_id: str) -> Optional[dict]:
-    all_entries = get_ref("queue_entries").get() or {}
-    for entry_id, entry in all_entries.items():
-        if (entry.get("patient_id") == patient_id and
-                entry.get("doctor_id") == doctor_id and
-                entry.get("status") == "serving"):
-            end_time = now_utc()
-            duration = None
-            if entry.get("consultation_start_time"):
-                try:
-                    start_str = entry["consultation_start_time"].replace("Z", "+00:00")
-                    start = datetime.fromisoformat(start_str)
-                    duration = int((end_time - start).total_seconds() / 60)
-                except Exception:
-                    pass
-            get_ref(f"queue_entries/{entry_id}").update({
-                "status": "completed",
-                "consultation_end_time": end_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "actual_duration": duration,
-            })
-            entry["id"] = entry_id
-            entry["status"] = "completed"
-            entry["actual_duration"] = duration
-            return entry
-    return None
+    serving = queue_repository.find_entries(patient_id=patient_id, doctor_id=doctor_id,
+                                            status="serving")
+    if not serving:
+        return None
+    entry = serving[0]
+    end_time = now_utc()
+    duration = None
+    if entry.get("consultation_start_time"):
+        try:
+            start_str = entry["consultation_start_time"].replace("Z", "+00:00")
+            start = datetime.fromisoformat(start_str)
+            duration = int((end_time - start).total_seconds() / 60)
+        except Exception:
+            pass
+    # Finished entries leave the live tree straight away
+    queue_repository.archive_entry(entry, {
+        "status": "completed",
+        "consultation_end_time": end_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "actual_duration": duration,
+    })
+    if duration is not None:
+        duration_stats.record_durations(doctor_id, [duration])
+    entry["status"] = "completed"
+    entry["actual_duration"] = duration
+    return entry
 
 
 def get_doctor_queue(doctor_id: str) -> List[dict]:
-    all_entries = get_ref("queue_entries").get() or {}
-    entries = []
-    for entry_id, entry in all_entries.items():
-        if (entry.get("doctor_id") == doctor_id and
-                entry.get("status") in ["confirmed", "waiting", "serving"]):
-            entry["id"] = entry_id
-            patient = get_ref(f"patients/{entry['patient_id']}").get() or {}
-            entry["patient_name"] = patient.get("name", "")
-            entries.append(entry)
-    entries.sort(key=lambda x: x.get("token_number", 0))
-    return entries
\ No newline at end of file
+    entries = queue_repository.find_entries(doctor_id=doctor_id, date=today_str(),
+                                            status=ACTIVE_STATUSES)
+    return name_snapshots.fill_missing(entries)
@@ -0,0 +1,80 @@
+"""
+Trained wait-time coefficients used by the predictor.
+
+wait_model/{version, table} is written by scripts/train_wait_model.py
+(see wait_model_training). table holds hour-of-day and weekday multipliers
+for consultation length, per doctor where enough history exists and a
+default fitted over all doctors:
+
+    {
+        "trained_at": "2025-01-01T02:00:00Z",
+        "samples": 5400,
+        "default": {"hour": [24 floats], "weekday": [7 floats]},
+        "doctors": {"<doctor_id>": {"hour": [...], "weekday": [...], "samples": 812}},
+    }
+
+The table is loaded once per process and kept in memory; every
+WAIT_MODEL_RELOAD_SECONDS only the version number is read, and the table is
+reloaded when it changed. Until a table is published, lookups return None
+and the predictor falls back to its built-in multipliers.
+"""
+import threading
+import time
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.core.database import get_ref
+
+MODEL_PATH = "wait_model"
+
+
+class CoefficientTable:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._table: dict = {}
+        self._checked_at: Optional[float] = None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < settings.WAIT_MODEL_RELOAD_SECONDS:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < settings.WAIT_MODEL_RELOAD_SECONDS:
+                return
+            version = get_ref(f"{MODEL_PATH}/version").get()
+            if version != self._version:
+                table = get_ref(f"{MODEL_PATH}/table").get() if version else None
+                self._table = table or {}
+                self._version = version
+            self._checked_at = now
+
+    def version(self):
+        self._refresh()
+        return self._version
+
+    def multipliers(self, doctor_id: str, hour: int, weekday: int) -> Optional[Tuple[float, float]]:
+        """(hour multiplier, weekday multiplier) for doctor_id, or None without a table."""
+        self._refresh()
+        coefficients = (self._table.get("doctors") or {}).get(doctor_id) or self._table.get("default")
+        if not coefficients:
+            return None
+        return coefficients["hour"][hour], coefficients["weekday"][weekday]
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = None
+
+
+_table = CoefficientTable()
+
+
+def multipliers(doctor_id: str, hour: int, weekday: int) -> Optional[Tuple[float, float]]:
+    return _table.multipliers(doctor_id, hour, weekday)
+
+
+def version():
+    return _table.version()
+
+
+def reload():
+    _table.invalidate()
@@ -0,0 +1,137 @@
+"""
+Offline fit of the wait-model coefficients (see app.services.wait_model).
+
+Completed entries in queue_history give (doctor, start hour, weekday,
+actual duration) samples. For each doctor with at least MIN_DOCTOR_SAMPLES
+samples, and once over all doctors for the default, the log duration is
+regressed on one-hot hour and weekday indicators with a ridge penalty:
+
+    log(duration) - mean = hour_effect[h] + weekday_effect[d]
+
+solved in one np.linalg.lstsq call. exp(effect) is the multiplier applied
+to the doctor's historical duration; the penalty pulls hours and weekdays
+with few samples towards 1.0. The result is published as a new version of
+the table, which serving processes pick up on their next version check.
+
+The queue depth factor is not fitted: queue_history does not record how many
+patients were ahead of an entry when it was booked.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.core.database import get_ref
+from app.services.counters import next_value
+from app.services.duration_stats import MIN_DURATION, MAX_DURATION
+from app.services.wait_model import MODEL_PATH
+
+HOURS = 24
+WEEKDAYS = 7
+RIDGE = 5.0
+MIN_DOCTOR_SAMPLES = 50
+MULTIPLIER_RANGE = (0.5, 2.0)
+VERSION_COUNTER = "counters/wait_model_version"
+
+Sample = Tuple[str, int, int, float]  # doctor_id, hour, weekday, minutes
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def collect_samples(history: Dict[str, dict]) -> List[Sample]:
+    """Training samples from queue_history/{date}/{entry_id}."""
+    samples = []
+    for day in history.values():
+        if not isinstance(day, dict):
+            continue
+        for entry in day.values():
+            if not isinstance(entry, dict) or entry.get("status") != "completed":
+                continue
+            minutes = entry.get("actual_duration")
+            started = _parse_time(entry.get("consultation_start_time"))
+            if started is None or not isinstance(minutes, (int, float)):
+                continue
+            if not MIN_DURATION <= minutes <= MAX_DURATION:
+                continue
+            samples.append((entry.get("doctor_id", ""), started.hour, started.weekday(),
+                            float(minutes)))
+    return samples
+
+
+def fit_multipliers(hours: np.ndarray, weekdays: np.ndarray,
+                    minutes: np.ndarray) -> Dict[str, list]:
+    """Ridge least-squares fit of hour and weekday multipliers on log duration."""
+    n = len(minutes)
+    width = HOURS + WEEKDAYS
+    design = np.zeros((n + width, width))
+    rows = np.arange(n)
+    design[rows, hours] = 1.0
+    design[rows, HOURS + weekdays] = 1.0
+    design[n:] = np.sqrt(RIDGE) * np.eye(width)
+
+    target = np.zeros(n + width)
+    log_minutes = np.log(minutes)
+    target[:n] = log_minutes - log_minutes.mean()
+
+    effects, *_ = np.linalg.lstsq(design, target, rcond=None)
+    multipliers = np.clip(np.exp(effects), *MULTIPLIER_RANGE).round(3)
+    return {"hour": multipliers[:HOURS].tolist(), "weekday": multipliers[HOURS:].tolist()}
+
+
+def fit_table(samples: Iterable[Sample], min_doctor_samples: int = MIN_DOCTOR_SAMPLES) -> dict:
+    samples = list(samples)
+    table = {
+        "trained_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "samples": len(samples),
+        "doctors": {},
+    }
+    if not samples:
+        return table
+
+    doctors = np.array([s[0] for s in samples])
+    hours = np.array([s[1] for s in samples], dtype=np.int64)
+    weekdays = np.array([s[2] for s in samples], dtype=np.int64)
+    minutes = np.array([s[3] for s in samples])
+
+    table["default"] = fit_multipliers(hours, weekdays, minutes)
+    for doctor_id in np.unique(doctors):
+        mask = doctors == doctor_id
+        count = int(mask.sum())
+        if doctor_id and count >= min_doctor_samples:
+            table["doctors"][str(doctor_id)] = {
+                **fit_multipliers(hours[mask], weekdays[mask], minutes[mask]),
+                "samples": count,
+            }
+    return table
+
+
+def publish(table: dict) -> int:
+    """
+    Write table as the next version; returns the version number. Versions
+    are allocated from a transactional counter, so concurrent trainers never
+    publish the same number. Table and version go in one multi-path update,
+    so a reader never pairs a new version with the previous table.
+    """
+    version = next_value(VERSION_COUNTER,
+                         seed=lambda: get_ref(f"{MODEL_PATH}/version").get() or 0)
+    get_ref("/").update({f"{MODEL_PATH}/table": table, f"{MODEL_PATH}/version": version})
+    return version
+
+
+def train(since: Optional[str] = None, dry_run: bool = False) -> dict:
+    """Fit a table from queue_history (dates >= since, if given) and publish it."""
+    history_ref = get_ref("queue_history")
+    if since:
+        history = history_ref.order_by_key().start_at(since).get() or {}
+    else:
+        history = history_ref.get() or {}
+    table = fit_table(collect_samples(history))
+    if not dry_run and table["samples"]:
+        table["version"] = publish(table)
+    return table
@@ -0,0 +1,54 @@
+"""
+Random arrival and service processes for the clinic simulator.
+
+All draws go through one numpy Generator, so a seed reproduces a run.
+Times are in seconds from the start of the simulated day.
+"""
+from typing import List
+import numpy as np
+
+
+class ClinicDistributions:
+    """
+    Arrivals are a Poisson process per doctor (exponential gaps at
+    patients_per_hour), rounded down to tick_seconds so patients arriving
+    within one tick book at the same instant. Consultation times are
+    lognormal around service_median_minutes; check-in delays exponential.
+    """
+
+    def __init__(self, seed: int = 0, patients_per_hour: float = 4.0,
+                 service_median_minutes: float = 12.0, service_sigma: float = 0.4,
+                 checkin_delay_minutes: float = 10.0, cancel_rate: float = 0.05,
+                 tick_seconds: int = 60):
+        self.rng = np.random.default_rng(seed)
+        self.patients_per_hour = patients_per_hour
+        self.service_median_minutes = service_median_minutes
+        self.service_sigma = service_sigma
+        self.checkin_delay_minutes = checkin_delay_minutes
+        self.cancel_rate = cancel_rate
+        self.tick_seconds = max(1, int(tick_seconds))
+
+    def arrivals(self, hours: float) -> List[int]:
+        """Arrival times of one doctor's patients within the first hours."""
+        if self.patients_per_hour <= 0:
+            return []
+        horizon = hours * 3600
+        mean_gap = 3600 / self.patients_per_hour
+        # Draw enough gaps to pass the horizon with overwhelming probability
+        count = int(horizon / mean_gap * 1.5) + 20
+        times = np.cumsum(self.rng.exponential(mean_gap, count))
+        times = times[times < horizon]
+        return (times // self.tick_seconds * self.tick_seconds).astype(int).tolist()
+
+    def service_seconds(self) -> int:
+        minutes = self.rng.lognormal(np.log(self.service_median_minutes), self.service_sigma)
+        return max(60, int(minutes * 60))
+
+    def checkin_delay_seconds(self) -> int:
+        return int(self.rng.exponential(self.checkin_delay_minutes * 60))
+
+    def cancels(self) -> bool:
+        return bool(self.rng.random() < self.cancel_rate)
+
+    def cancel_delay_seconds(self) -> int:
+        return int(self.rng.uniform(60, self.checkin_delay_minutes * 120))
@@ -0,0 +1,287 @@
+"""
+Discrete-event simulation of clinic days, driven through queue_service.
+
+Each doctor gets a stream of patients from ClinicDistributions. Events are
+processed from a heap in simulated time against an empty in-process
+database, with the service clock pinned to the event time:
+
+    arrival    queue_service.book_token()
+    check-in   queue_service.check_in_patient(); an idle doctor calls the next
+               waiting token (queue_service.call_next())
+    cancel     the entry is archived as cancelled, as DELETE /patient-auth/cancel does
+    complete   queue_service.complete_consultation(), then the next token
+    poll       every poll_minutes, each doctor's queue is read and predicted
+               as GET /queue/status does
+
+Arrivals that land on the same tick are booked concurrently from a thread
+pool, so the token counter transaction sees real contention. The wall time
+of every call is recorded per endpoint; the wait predicted at booking is
+compared with the actual wait until the consultation started.
+
+Doctors call the lowest checked-in token as soon as they are free, and keep
+serving after the arrival window closes until every checked-in patient has
+been seen.
+"""
+import contextvars
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from app.core.database import get_ref, isolated_local_db
+from app.core.local_db import LocalDatabase
+from app.services import queue_repository, queue_service, wait_model, wait_predictor
+from app.simulation.distributions import ClinicDistributions
+from app.simulation.metrics import LatencyRecorder, error_summary, summary
+
+# Processing order of events that share a timestamp: free doctors first
+COMPLETE, CHECK_IN, CANCEL, ARRIVAL, POLL = range(5)
+
+DEFAULT_START = datetime(2025, 3, 3, 8, 0, tzinfo=timezone.utc)
+
+
+class ClinicSimulation:
+    def __init__(self, doctors: int = 4, hours: float = 8.0,
+                 distributions: Optional[ClinicDistributions] = None,
+                 start: Optional[datetime] = None, poll_minutes: float = 5.0,
+                 workers: int = 8):
+        if doctors < 1:
+            raise ValueError("doctors must be at least 1")
+        self.doctor_ids = [f"sim-doctor-{i + 1}" for i in range(doctors)]
+        self.hours = hours
+        self.distributions = distributions or ClinicDistributions()
+        self.start = start or DEFAULT_START
+        self.poll_seconds = int(poll_minutes * 60)
+        self.workers = max(1, workers)
+
+        self.now = self.start
+        self.events: List[Tuple[datetime, int, int, tuple]] = []
+        self._sequence = itertools.count()
+        self.patients: Dict[str, dict] = {}
+        self.serving: Dict[str, Optional[str]] = {d: None for d in self.doctor_ids}
+        self.busy_seconds: Dict[str, float] = {d: 0.0 for d in self.doctor_ids}
+        self.latency = LatencyRecorder()
+        self.queue_lengths: List[int] = []
+        self.batches: List[Tuple[int, int]] = []  # (bookings, most for one doctor)
+        self.concurrent_booking: List[float] = []
+        self.serial_booking: List[float] = []
+        self.database: Optional[LocalDatabase] = None
+        self.wall_seconds = 0.0
+        self.finished_at = self.start
+
+    # ── Setup ─────────────────────────────────────────────────────────────
+
+    def _schedule(self, moment: datetime, kind: int, *payload):
+        heapq.heappush(self.events, (moment, kind, next(self._sequence), payload))
+
+    def _plan(self):
+        """Draw every doctor's arrivals and write the doctors and patients they need."""
+        updates = {}
+        for number, doctor_id in enumerate(self.doctor_ids, 1):
+            updates[f"doctors/{doctor_id}"] = {
+                "name": f"Doctor {number}",
+                "specialization": "General Medicine",
+                "email": f"{doctor_id}@example.com",
+            }
+            for offset in self.distributions.arrivals(self.hours):
+                patient_id = f"sim-patient-{len(self.patients) + 1}"
+                self.patients[patient_id] = {"doctor_id": doctor_id, "status": "pending"}
+                updates[f"patients/{patient_id}"] = {"name": f"Patient {len(self.patients)}"}
+                self._schedule(self.start + timedelta(seconds=offset), ARRIVAL, patient_id)
+        get_ref("/").update(updates)
+        if self.poll_seconds > 0:
+            self._schedule(self.start, POLL)
+
+    # ── Events ────────────────────────────────────────────────────────────
+
+    def _book(self, patient_id: str) -> Tuple[dict, float]:
+        started = time.perf_counter()
+        with self.latency.measure("book_token"):
+            result = queue_service.book_token(patient_id, self.patients[patient_id]["doctor_id"])
+        return result, time.perf_counter() - started
+
+    def _arrivals(self, patient_ids: List[str], pool: ThreadPoolExecutor):
+        if len(patient_ids) > 1:
+            # Workers run in copies of this context, which holds the isolated database
+            context = contextvars.copy_context()
+            results = list(pool.map(lambda p: context.copy().run(self._book, p), patient_ids))
+            doctors = [self.patients[p]["doctor_id"] for p in patient_ids]
+            self.batches.append((len(patient_ids), max(doctors.count(d) for d in set(doctors))))
+            self.concurrent_booking.extend(elapsed for _, elapsed in results)
+        else:
+            results = [self._book(patient_ids[0])]
+            self.serial_booking.append(results[0][1])
+
+        # Random draws stay on this thread, in arrival order, for reproducibility
+        for patient_id, (result, _) in zip(patient_ids, results):
+            entry = result["entry"]
+            self.patients[patient_id].update({
+                "status": "confirmed",
+                "token_number": entry["token_number"],
+                "booked_at": self.now,
+                "predicted_minutes": result["ai_prediction"]["estimated_minutes"],
+            })
+            if self.distributions.cancels():
+                delay = self.distributions.cancel_delay_seconds()
+                self._schedule(self.now + timedelta(seconds=delay), CANCEL, patient_id)
+            else:
+                delay = self.distributions.checkin_delay_seconds()
+                self._schedule(self.now + timedelta(seconds=delay), CHECK_IN, patient_id)
+
+    def _check_in(self, patient_id: str):
+        with self.latency.measure("check_in_patient"):
+            entry = queue_service.check_in_patient(patient_id)
+        if entry is None:
+            return
+        patient = self.patients[patient_id]
+        patient["status"] = "waiting"
+        if self.serving[patient["doctor_id"]] is None:
+            self._call_next(patient["doctor_id"])
+
+    def _cancel(self, patient_id: str):
+        with self.latency.measure("cancel_booking"):
+            entry = queue_service.get_active_queue_for_patient(patient_id)
+            if entry is None or entry.get("status") == "serving":
+                return
+            queue_repository.archive_entry(entry, {
+                "status": "cancelled",
+                "cancelled_at": self.now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            })
+        self.patients[patient_id]["status"] = "cancelled"
+
+    def _call_next(self, doctor_id: str):
+        with self.latency.measure("call_next"):
+            entry = queue_service.call_next(doctor_id)
+        if entry is None:
+            return
+        patient = self.patients[entry["patient_id"]]
+        patient.update({"status": "serving", "started_at": self.now})
+        self.serving[doctor_id] = entry["patient_id"]
+        duration = self.distributions.service_seconds()
+        self.busy_seconds[doctor_id] += duration
+        self._schedule(self.now + timedelta(seconds=duration), COMPLETE, entry["patient_id"])
+
+    def _complete(self, patient_id: str):
+        doctor_id = self.patients[patient_id]["doctor_id"]
+        with self.latency.measure("complete_consultation"):
+            queue_service.complete_consultation(patient_id, doctor_id)
+        self.patients[patient_id]["status"] = "completed"
+        self.serving[doctor_id] = None
+        self.finished_at = max(self.finished_at, self.now)
+        self._call_next(doctor_id)
+
+    def _poll(self):
+        for doctor_id in self.doctor_ids:
+            with self.latency.measure("queue_status"):
+                queue = queue_service.get_doctor_queue(doctor_id)
+                queue_service.predict_entries(queue)
+            self.queue_lengths.append(len(queue))
+        following = self.now + timedelta(seconds=self.poll_seconds)
+        if following < self.start + timedelta(hours=self.hours):
+            self._schedule(following, POLL)
+
+    # ── Run ───────────────────────────────────────────────────────────────
+
+    def run(self) -> dict:
+        self.database = LocalDatabase()
+        with isolated_local_db(self.database):
+            _reset_caches()
+            queue_service.set_clock(lambda: self.now)
+            try:
+                self._plan()
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    while self.events:
+                        self._step(pool)
+                self.wall_seconds = time.perf_counter() - started
+            finally:
+                queue_service.set_clock(None)
+                _reset_caches()
+        return self.report()
+
+    def _step(self, pool: ThreadPoolExecutor):
+        moment, kind, _, payload = heapq.heappop(self.events)
+        self.now = moment
+        if kind == ARRIVAL:
+            # Everyone booking on this tick goes in one concurrent batch
+            patient_ids = [payload[0]]
+            while self.events and self.events[0][0] == moment and self.events[0][1] == ARRIVAL:
+                patient_ids.append(heapq.heappop(self.events)[3][0])
+            self._arrivals(patient_ids, pool)
+        elif kind == CHECK_IN:
+            self._check_in(*payload)
+        elif kind == CANCEL:
+            self._cancel(*payload)
+        elif kind == COMPLETE:
+            self._complete(*payload)
+        elif kind == POLL:
+            self._poll()
+
+    # ── Report ────────────────────────────────────────────────────────────
+
+    def _token_contention(self) -> dict:
+        tokens: Dict[str, List[int]] = {}
+        for patient in self.patients.values():
+            if "token_number" in patient:
+                tokens.setdefault(patient["doctor_id"], []).append(patient["token_number"])
+        duplicates = sum(len(values) - len(set(values)) for values in tokens.values())
+        return {
+            "concurrent_batches": len(self.batches),
+            "largest_batch": max((size for size, _ in self.batches), default=0),
+            "largest_same_doctor": max((same for _, same in self.batches), default=0),
+            "duplicate_tokens": duplicates,
+            "booking_ms_concurrent": summary([s * 1000 for s in self.concurrent_booking]),
+            "booking_ms_serial": summary([s * 1000 for s in self.serial_booking]),
+        }
+
+    def report(self) -> dict:
+        statuses = [p["status"] for p in self.patients.values()]
+        waits, errors = [], []
+        for patient in self.patients.values():
+            if "started_at" not in patient:
+                continue
+            actual = (patient["started_at"] - patient["booked_at"]).total_seconds() / 60
+            waits.append(actual)
+            errors.append(patient["predicted_minutes"] - actual)
+
+        completed = statuses.count("completed")
+        span_hours = max(self.hours, (self.finished_at - self.start).total_seconds() / 3600)
+        calls = sum(len(values) for values in self.latency.samples.values())
+        stats = self.database.stats if self.database else {"reads": 0, "writes": 0}
+        return {
+            "doctors": len(self.doctor_ids),
+            "hours": self.hours,
+            "patients": len(self.patients),
+            "completed": completed,
+            "cancelled": statuses.count("cancelled"),
+            "unserved": len(statuses) - completed - statuses.count("cancelled"),
+            "overtime_minutes": round(max(0.0, span_hours - self.hours) * 60, 1),
+            "throughput_per_hour": round(completed / span_hours, 2),
+            "utilization": round(sum(self.busy_seconds.values())
+                                 / (span_hours * 3600 * len(self.doctor_ids)), 3),
+            "wait_minutes": summary(waits, 1),
+            "queue_length": summary(self.queue_lengths, 1),
+            "prediction_error_minutes": error_summary(errors),
+            "token_contention": self._token_contention(),
+            "latency_ms": self.latency.report(),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "calls_per_second": round(calls / self.wall_seconds, 1) if self.wall_seconds else None,
+            "database": {**stats, "reads_per_call": round(stats["reads"] / calls, 2) if calls else 0},
+        }
+
+
+def _reset_caches():
+    queue_repository.reset()
+    wait_predictor.clear_cache()
+    wait_model.reload()
+
+
+def simulate(doctors: int = 4, patients_per_hour: float = 4.0, hours: float = 8.0,
+             seed: int = 0, **options) -> dict:
+    """Run one simulated day; options go to ClinicDistributions or ClinicSimulation."""
+    names = ("service_median_minutes", "service_sigma", "checkin_delay_minutes",
+             "cancel_rate", "tick_seconds")
+    distributions = ClinicDistributions(seed=seed, patients_per_hour=patients_per_hour,
+                                        **{k: options.pop(k) for k in names if k in options})
+    return ClinicSimulation(doctors, hours, distributions, **options).run()
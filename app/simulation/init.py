@@ -0,0 +1 @@
+# Discrete-event queue simulation
\ No newline at end of file
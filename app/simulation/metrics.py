@@ -0,0 +1,53 @@
+"""Summaries shared by the simulator and the prediction backtest."""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List
+import numpy as np
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def summary(values: Iterable[float], digits: int = 3) -> dict:
+    """mean, quantiles and max of values ({} when empty)."""
+    values = np.asarray(list(values), dtype=float)
+    if not len(values):
+        return {}
+    result = {"mean": round(float(values.mean()), digits)}
+    for q in QUANTILES:
+        result[f"p{int(q * 100)}"] = round(float(np.quantile(values, q)), digits)
+    result["max"] = round(float(values.max()), digits)
+    return result
+
+
+def error_summary(errors: Iterable[float]) -> dict:
+    """MAE, bias (> 0: predicted too long) and absolute-error quantiles, in minutes."""
+    errors = np.asarray(list(errors), dtype=float)
+    if not len(errors):
+        return {}
+    absolute = np.abs(errors)
+    result = {"mae": round(float(absolute.mean()), 2), "bias": round(float(errors.mean()), 2)}
+    for q in QUANTILES[:3]:
+        result[f"abs_p{int(q * 100)}"] = round(float(np.quantile(absolute, q)), 2)
+    return result
+
+
+class LatencyRecorder:
+    """Wall time of calls, grouped by name."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    @contextmanager
+    def measure(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(name, []).append(time.perf_counter() - started)
+
+    def report(self) -> Dict[str, dict]:
+        """{name: {"calls": n, "ms": summary}}"""
+        return {
+            name: {"calls": len(values), "ms": summary(np.array(values) * 1000)}
+            for name, values in sorted(self.samples.items())
+        }
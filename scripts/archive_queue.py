@@ -0,0 +1,24 @@
+"""
+Move finished queue entries from the live queues/ shards to queue_history/{date}.
+Safe to run repeatedly (e.g. nightly); only terminal entries and unfinished
+entries of past days (archived as expired) are moved.
+Usage: python scripts/archive_queue.py
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.archive_service import archive_terminal_entries
+from app.services.queue_service import now_utc
+
+
+def main():
+    today = now_utc().date().isoformat()
+    result = archive_terminal_entries(today)
+    print(f"Scanned {result['scanned']} live queue entries")
+    print(f"  {result['archived']} finished entries moved to queue_history "
+          f"({result['expired']} of them expired)")
+    print(f"  {result['counters_pruned']} old token counters removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Build the lookup indexes the services maintain on write, for data that was
+created before those indexes existed. Safe to re-run.
+Usage: python scripts/backfill_indexes.py [accounts|adjacency|records|names ...]
+       (no arguments = every index)
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import get_ref
+from app.services import account_index, name_snapshots
+from app.services.queue_repository import shard_path
+from app.services.patient_service import link_updates
+from app.services.medical_record_service import record_index_updates
+
+
+def backfill_accounts():
+    """account_index/{doctors,patients}/{email,phone}/{key} -> id"""
+    for kind in ("doctors", "patients"):
+        accounts = get_ref(kind).get() or {}
+        conflicts = 0
+        for account_id, account in accounts.items():
+            try:
+                account_index.reserve(kind, account_id,
+                                      account.get("email"), account.get("phone"))
+            except account_index.AccountExistsError as e:
+                conflicts += 1
+                print(f"  ! {kind[:-1]} {account_id}: {e.field} "
+                      f"{account.get(e.field)!r} already used by another account")
+        print(f"  {len(accounts)} {kind} indexed ({conflicts} conflicts)")
+
+
+def backfill_adjacency():
+    """doctor_patients/{doctor}/{patient} and patient_doctors/{patient}/{doctor}"""
+    links = get_ref("doctor_patient").get() or {}
+    updates = {}
+    for link in links.values():
+        if isinstance(link, dict) and link.get("doctor_id") and link.get("patient_id"):
+            updates.update(link_updates(link["doctor_id"], link["patient_id"]))
+    if updates:
+        get_ref("/").update(updates)
+    print(f"  {len(links)} doctor-patient links indexed")
+
+
+def backfill_records():
+    """records_by_patient/{patient}/{visit_date}_{record_id} -> record_id
+    and records_by_doctor/{doctor}/{record_id}"""
+    records = get_ref("medical_records").get() or {}
+    updates = {}
+    for record_id, record in records.items():
+        if isinstance(record, dict) and record.get("patient_id"):
+            updates.update(record_index_updates(record_id, record))
+    if updates:
+        get_ref("/").update(updates)
+    print(f"  {len(records)} medical records indexed")
+
+
+def backfill_names():
+    """doctor_name/doctor_specialization/patient_name on live queue entries and records"""
+    rows = {}
+    for record_id, record in (get_ref("medical_records").get() or {}).items():
+        if isinstance(record, dict):
+            rows[f"medical_records/{record_id}"] = record
+    for doctor_id, shards in (get_ref("queues").get() or {}).items():
+        for date, shard in (shards or {}).items():
+            for entry_id, entry in (shard or {}).items():
+                if isinstance(entry, dict):
+                    rows[f"{shard_path(doctor_id, date)}/{entry_id}"] = entry
+    fields = [f for _, snapshot in name_snapshots.SNAPSHOTS.values() for f in snapshot]
+    missing = {path: row for path, row in rows.items() if not all(f in row for f in fields)}
+    name_snapshots.fill_missing(list(missing.values()))
+    updates = {f"{path}/{f}": row[f] for path, row in missing.items() for f in fields if f in row}
+    if updates:
+        get_ref("/").update(updates)
+    print(f"  {len(missing)} of {len(rows)} entries/records given name snapshots")
+
+
+BACKFILLS = {
+    "accounts": backfill_accounts,
+    "adjacency": backfill_adjacency,
+    "records": backfill_records,
+    "names": backfill_names,
+}
+
+
+def main(names):
+    for name in names or BACKFILLS:
+        print(f"Backfilling {name}...")
+        BACKFILLS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,44 @@
+"""
+Replay historical queue days and report wait-time prediction error and cost.
+Usage: python scripts/backtest_predictions.py [--snapshot export.json]
+                                              [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+                                              [--warmup-days N] [--json report.json]
+Without --snapshot, finished entries are read from the configured database.
+"""
+import sys, os, json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.backtest import backtest, load_database, load_snapshot
+
+
+def _option(args, name, default=None):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main(args):
+    snapshot = _option(args, "--snapshot")
+    if snapshot:
+        entries, model_table = load_snapshot(snapshot)
+    else:
+        entries, model_table = load_database(_option(args, "--since"), _option(args, "--until"))
+    warmup_days = int(_option(args, "--warmup-days", 0))
+
+    report = backtest(entries, model_table, warmup_days)
+    print(f"Replayed {report['events']} events of {report['entries']} entries"
+          f" (scored from {report['scored_from']})")
+    print(f"  coefficient table: {'source database' if model_table else 'built-in'}")
+    print(f"  {report['predictions']} predictions")
+    for title, key in (("error (min)", "error_minutes"), ("latency (ms)", "latency_ms"),
+                       ("reads/call", "reads_per_call")):
+        values = ", ".join(f"{k}={v}" for k, v in report[key].items())
+        print(f"  {title:14s} {values or '-'}")
+
+    output = _option(args, "--json")
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"  report written to {output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
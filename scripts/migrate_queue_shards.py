@@ -0,0 +1,70 @@
+"""
+One-shot migration from the flat queue_entries/{entry_id} layout to
+per-doctor, per-day shards:
+
+    queues/{doctor_id}/{date}/{entry_id}    live (confirmed/waiting/serving) entries
+    patient_queue/{patient_id}/{entry_id}   pointer {"doctor_id", "date"} per live entry
+    queue_history/{date}/{entry_id}         completed/cancelled entries
+
+Finished entries' durations are folded into duration_stats. Each batch is
+written and removed from queue_entries in one multi-path update, so the
+script can be re-run if interrupted.
+Usage: python scripts/migrate_queue_shards.py [--dry-run]
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import get_ref
+from app.services.archive_service import record_batch_durations
+from app.services.queue_repository import TERMINAL_STATUSES, shard_path
+
+BATCH_SIZE = 500
+
+
+def _entry_date(entry: dict) -> str:
+    return entry.get("date") or (entry.get("appointment_time") or "")[:10] or "undated"
+
+
+def migrate(dry_run: bool = False):
+    all_entries = get_ref("queue_entries").get() or {}
+    print(f"Migrating {len(all_entries)} queue entries...")
+
+    ids = list(all_entries)
+    live = archived = skipped = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        updates = {}
+        finished = {}
+        for entry_id in ids[start:start + BATCH_SIZE]:
+            entry = all_entries[entry_id]
+            missing = [f for f in ("doctor_id", "patient_id")
+                       if not isinstance(entry, dict) or not entry.get(f)]
+            if missing:
+                print(f"  ! entry {entry_id}: no {' or '.join(missing)}, left in place")
+                skipped += 1
+                continue
+            entry["date"] = _entry_date(entry)
+            updates[f"queue_entries/{entry_id}"] = None
+            if entry.get("status") in TERMINAL_STATUSES:
+                updates[f"queue_history/{entry['date']}/{entry_id}"] = entry
+                finished[entry_id] = entry
+                archived += 1
+            else:
+                updates[f"{shard_path(entry['doctor_id'], entry['date'])}/{entry_id}"] = entry
+                updates[f"patient_queue/{entry['patient_id']}/{entry_id}"] = {
+                    "doctor_id": entry["doctor_id"], "date": entry["date"],
+                }
+                live += 1
+        if updates and not dry_run:
+            get_ref("/").update(updates)
+            record_batch_durations(finished)
+
+    print(f"  {live} live entries moved to queues/")
+    print(f"  {archived} finished entries moved to queue_history/")
+    if skipped:
+        print(f"  {skipped} malformed entries left in queue_entries")
+    if dry_run:
+        print("Dry run — nothing was written.")
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,59 @@
+"""
+Simulate clinic days through the queue services and report capacity figures.
+Usage: python scripts/simulate_clinic.py [--doctors N] [--patients-per-hour M] [--hours H]
+                                         [--service-minutes MEDIAN] [--cancel-rate R]
+                                         [--tick-seconds S] [--workers W] [--seed SEED]
+                                         [--json report.json]
+--patients-per-hour is per doctor. Runs against a fresh in-process database,
+so no Firebase credentials are needed.
+"""
+import sys, os, json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The configured database is never touched; don't connect to Firebase on import
+os.environ.setdefault("DATABASE_BACKEND", "local")
+
+from app.simulation.engine import simulate
+
+
+def _option(args, name, default=None):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main(args):
+    report = simulate(
+        doctors=int(_option(args, "--doctors", 4)),
+        patients_per_hour=float(_option(args, "--patients-per-hour", 4.0)),
+        hours=float(_option(args, "--hours", 8.0)),
+        seed=int(_option(args, "--seed", 0)),
+        service_median_minutes=float(_option(args, "--service-minutes", 12.0)),
+        cancel_rate=float(_option(args, "--cancel-rate", 0.05)),
+        tick_seconds=int(_option(args, "--tick-seconds", 60)),
+        workers=int(_option(args, "--workers", 8)),
+    )
+    print(f"Simulated {report['doctors']} doctors for {report['hours']}h:"
+          f" {report['patients']} patients, {report['completed']} completed,"
+          f" {report['cancelled']} cancelled, {report['unserved']} unserved")
+    print(f"  throughput {report['throughput_per_hour']}/h, utilization {report['utilization']},"
+          f" overtime {report['overtime_minutes']} min")
+    for title, key in (("wait (min)", "wait_minutes"), ("queue length", "queue_length"),
+                       ("error (min)", "prediction_error_minutes")):
+        values = ", ".join(f"{k}={v}" for k, v in report[key].items())
+        print(f"  {title:14s} {values or '-'}")
+    contention = report["token_contention"]
+    print(f"  token contention: {contention['concurrent_batches']} concurrent batches"
+          f" (largest {contention['largest_batch']}, {contention['largest_same_doctor']}"
+          f" for one doctor), {contention['duplicate_tokens']} duplicate tokens")
+    print(f"  latency (ms), {report['calls_per_second']} calls/s over {report['wall_seconds']}s:")
+    for name, latency in report["latency_ms"].items():
+        values = ", ".join(f"{k}={v}" for k, v in latency["ms"].items())
+        print(f"    {name:22s} n={latency['calls']} {values}")
+
+    output = _option(args, "--json")
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"  report written to {output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
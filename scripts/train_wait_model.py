@@ -0,0 +1,34 @@
+"""
+Fit the wait-time coefficient table from queue_history and publish it.
+Serving processes pick up the new version within WAIT_MODEL_RELOAD_SECONDS.
+Usage: python scripts/train_wait_model.py [--since YYYY-MM-DD] [--dry-run]
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.wait_model_training import train
+
+
+def main(args):
+    since = None
+    if "--since" in args:
+        since = args[args.index("--since") + 1]
+    dry_run = "--dry-run" in args
+
+    table = train(since=since, dry_run=dry_run)
+    print(f"Fitted on {table['samples']} completed consultations")
+    if not table["samples"]:
+        print("  nothing to publish")
+        return
+    print(f"  {len(table['doctors'])} doctors with their own coefficients")
+    default = table["default"]
+    peak = max(range(len(default["hour"])), key=default["hour"].__getitem__)
+    print(f"  default: longest consultations at {peak:02d}:00 (x{default['hour'][peak]})")
+    if dry_run:
+        print("  dry run, table not published")
+    else:
+        print(f"  published as version {table['version']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
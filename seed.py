@@ -7,6 +7,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.core.database import get_ref
 from app.core.security import get_password_hash
+from app.services import account_index, name_snapshots
+from app.services.patient_service import link_doctor_to_patient
+from app.services.medical_record_service import record_index_updates
 import uuid
 
 def seed():
@@ -14,7 +17,13 @@ def seed():
     get_ref("doctors").delete()
     get_ref("patients").delete()
     get_ref("doctor_patient").delete()
+    get_ref("doctor_patients").delete()
+    get_ref("patient_doctors").delete()
     get_ref("medical_records").delete()
+    get_ref("records_by_patient").delete()
+    get_ref("records_by_doctor").delete()
+    get_ref("counters").delete()
+    get_ref("account_index").delete()
 
     print("Seeding Firebase Realtime Database...")
 
@@ -37,6 +46,7 @@ def seed():
     for d in doctors:
         did = str(uuid.uuid4())
         get_ref(f"doctors/{did}").set(d)
+        account_index.reserve("doctors", did, d["email"], d["phone"])
         doc_ids.append(did)
     print(f"  {len(doctors)} doctors created")
 
@@ -67,6 +77,7 @@ def seed():
     for p in patients:
         pid = str(uuid.uuid4())
         get_ref(f"patients/{pid}").set(p)
+        account_index.reserve("patients", pid, p["email"], p["phone"])
         pat_ids.append(pid)
     print(f"  {len(patients)} patients created")
 
@@ -78,9 +89,7 @@ def seed():
         (doc_ids[2], pat_ids[2]),
     ]
     for did, pid in links:
-        get_ref(f"doctor_patient/{did}_{pid}").set({
-            "doctor_id": did, "patient_id": pid
-        })
+        link_doctor_to_patient(did, pid)
     print(f"  {len(links)} doctor-patient links created")
 
     # Medical Records
@@ -204,7 +213,8 @@ def seed():
 
     for r in records:
         rid = str(uuid.uuid4())
-        get_ref(f"medical_records/{rid}").set(r)
+        r.update(name_snapshots.snapshot(r["doctor_id"], r["patient_id"]))
+        get_ref("/").update({f"medical_records/{rid}": r, **record_index_updates(rid, r)})
     print(f"  {len(records)} medical records created")
 
     print("\nFirebase Realtime Database seeded successfully!")
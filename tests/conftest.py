@@ -0,0 +1,33 @@
+"""
+Shared fixtures: every test runs against a fresh in-process database.
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_BACKEND", "local")
+
+import pytest
+from app.core.database import get_ref, isolated_local_db
+from app.core.local_db import LocalDatabase
+from app.services import queue_repository, wait_model, wait_predictor
+
+
+def _reset_caches():
+    queue_repository.reset()
+    wait_predictor.clear_cache()
+    wait_model.reload()
+
+
+@pytest.fixture
+def database():
+    with isolated_local_db(LocalDatabase()) as db:
+        _reset_caches()
+        get_ref("/").update({
+            "doctors/d1": {"name": "Dr A", "specialization": "General", "email": "a@example.com"},
+            "doctors/d2": {"name": "Dr B", "specialization": "General", "email": "b@example.com"},
+            "patients/p1": {"name": "Pat One"},
+            "patients/p2": {"name": "Pat Two"},
+            "patients/p3": {"name": "Pat Three"},
+        })
+        yield db
+        _reset_caches()
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta, timezone
+from app.core.database import get_ref
+from app.services import archive_service, queue_repository, queue_service
+
+
+def test_unfinished_entries_of_past_days_are_archived_as_expired(database):
+    today = datetime(2025, 3, 4, 9, 0, tzinfo=timezone.utc)
+    queue_service.set_clock(lambda: today - timedelta(days=1))
+    try:
+        stale = queue_service.book_token("p1", "d1")["entry"]
+        queue_service.check_in_patient("p1")
+        queue_service.set_clock(lambda: today)
+        current = queue_service.book_token("p2", "d1")["entry"]
+
+        result = archive_service.archive_terminal_entries("2025-03-04")
+    finally:
+        queue_service.set_clock(None)
+
+    assert result["archived"] == result["expired"] == 1
+    archived = get_ref(f"queue_history/2025-03-03/{stale['id']}").get()
+    assert archived["status"] == "expired"
+    assert archived["expired_at"] == "2025-03-04T09:00:00Z"
+    assert get_ref(f"{queue_repository.shard_path('d1', '2025-03-03')}/{stale['id']}").get() is None
+    assert not queue_repository.find_entries(patient_id="p1")
+    assert [e["id"] for e in queue_repository.find_entries(patient_id="p2")] == [current["id"]]
@@ -0,0 +1,23 @@
+import asyncio
+from app.services import async_queue_service, queue_repository, queue_service
+
+
+def test_status_reads_go_through_the_async_client(database, monkeypatch):
+    entry = queue_service.book_token("p1", "d1")["entry"]
+    queue_repository.reset()
+
+    def blocking_read(path):
+        raise AssertionError(f"blocking read of {path}")
+
+    monkeypatch.setattr(queue_repository, "get_ref", blocking_read)
+
+    async def status():
+        found = await async_queue_service.get_active_queue_for_patient("p1")
+        return found, await async_queue_service.build_queue_dict(found)
+
+    found, queue = asyncio.run(status())
+
+    assert found["id"] == entry["id"]
+    assert queue["token_number"] == entry["token_number"]
+    assert queue["position_in_queue"] == 1
+    assert queue["current_serving_token"] == 0
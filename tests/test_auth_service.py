@@ -0,0 +1,15 @@
+import pytest
+from app.services import account_index, auth_service
+
+
+def test_failed_doctor_write_releases_the_email_and_phone(database, monkeypatch):
+    def fail(password):
+        raise RuntimeError("hashing backend unavailable")
+
+    monkeypatch.setattr(auth_service, "get_password_hash", fail)
+    with pytest.raises(RuntimeError):
+        auth_service.register_doctor("Dr New", "new@example.com", "+923001112224",
+                                     "General", "City", "secret")
+
+    assert account_index.lookup("doctors", "email", "new@example.com") is None
+    assert account_index.lookup("doctors", "phone", "+923001112224") is None
@@ -0,0 +1,67 @@
+import threading
+import pytest
+from app.core.database import get_local_db, get_ref, isolated_local_db
+from app.core.local_db import LocalDatabase
+
+
+def test_isolated_database_is_only_seen_by_its_own_thread():
+    entered, release = threading.Event(), threading.Event()
+    seen = {}
+
+    def isolated():
+        with isolated_local_db(LocalDatabase()) as database:
+            get_ref("doctors/d9").set({"name": "Dr Isolated"})
+            seen["inside"] = get_local_db() is database
+            entered.set()
+            release.wait(5)
+
+    worker = threading.Thread(target=isolated)
+    worker.start()
+    entered.wait(5)
+    try:
+        seen["outside"] = get_ref("doctors/d9").get()
+    finally:
+        release.set()
+        worker.join()
+
+    assert seen == {"inside": True, "outside": None}
+
+
+def test_child_queries_order_like_the_realtime_database():
+    ref = LocalDatabase().reference("scores")
+    ref.set({
+        "a": {"score": 10}, "b": {"score": "ten"}, "c": {"score": 2},
+        "d": {}, "e": {"score": True}, "f": {"score": 2}, "g": {"other": 1},
+    })
+
+    ordered = ref.order_by_child("score").get()
+    window = ref.order_by_child("score").start_at(2).end_at(10).limit_to_last(2).get()
+
+    # Missing values first, then booleans, numbers, strings; ties by key
+    assert list(ordered) == ["g", "e", "c", "f", "a", "b"]
+    assert list(window) == ["f", "a"]
+    assert list(ref.order_by_key().end_at("c").limit_to_last(2).get()) == ["b", "c"]
+
+
+def test_transaction_returning_none_is_rejected_and_writes_nothing():
+    ref = LocalDatabase().reference("counter")
+    ref.set(5)
+
+    with pytest.raises(ValueError):
+        ref.transaction(lambda current: None)
+
+    assert ref.transaction(lambda current: current + 1) == 6
+    assert ref.get() == 6
+
+
+def test_sqlite_file_is_reloaded_after_a_restart(tmp_path):
+    path = str(tmp_path / "local.db")
+    first = LocalDatabase(path)
+    first.reference("doctors/d1").set({"name": "Dr A", "tags": {"x": True}})
+    first.reference("/").update({"doctors/d1/name": "Dr B", "patients/p1": {"name": "P"}})
+    first.reference("patients/p1").delete()
+    first.close()
+
+    reopened = LocalDatabase(path)
+
+    assert reopened.reference("/").get() == {"doctors": {"d1": {"name": "Dr B", "tags": {"x": True}}}}
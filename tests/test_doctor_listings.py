@@ -0,0 +1,27 @@
+from app.core.security import create_access_token
+from app.routes.patient_auth import get_all_doctors
+
+
+def _authorization(patient_id: str) -> str:
+    return "Bearer " + create_access_token(data={"sub": patient_id, "role": "patient"})
+
+
+def test_doctor_list_reads_whole_doctors_without_a_projection(database):
+    reads = database.stats["reads"]
+    listing = get_all_doctors(None, _authorization("p1"))["doctors"]
+
+    # One shallow read for the ids, then one read per doctor
+    assert database.stats["reads"] - reads == 3
+    assert {d["id"]: d["name"] for d in listing} == {"d1": "Dr A", "d2": "Dr B"}
+    assert set(listing[0]) == {"id", "name", "specialization", "hospital"}
+
+
+def test_doctor_list_reads_only_the_requested_fields(database):
+    reads = database.stats["reads"]
+    listing = get_all_doctors("name", _authorization("p1"))["doctors"]
+
+    # name and is_active for each doctor
+    assert database.stats["reads"] - reads == 1 + 2 * 2
+    assert sorted(listing, key=lambda d: d["id"]) == [
+        {"id": "d1", "name": "Dr A"}, {"id": "d2", "name": "Dr B"},
+    ]
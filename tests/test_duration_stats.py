@@ -0,0 +1,35 @@
+import random
+import numpy as np
+import pytest
+from app.core.database import get_ref
+from app.services import duration_stats
+
+
+def test_summary_matches_a_reference_computation(database):
+    rng = random.Random(7)
+    batches = [[rng.randint(1, 130) for _ in range(rng.randint(1, 12))] for _ in range(20)]
+    for batch in batches:
+        duration_stats.record_durations("d1", batch)
+
+    durations = sum(batches, [])
+    kept = [d for d in durations if duration_stats.MIN_DURATION <= d <= duration_stats.MAX_DURATION]
+    ewma = None
+    for minutes in kept:
+        ewma = minutes if ewma is None else (
+            duration_stats.EWMA_ALPHA * minutes + (1 - duration_stats.EWMA_ALPHA) * ewma)
+
+    stats = duration_stats.get_stats("d1")
+
+    assert stats["observed"] == len(durations)
+    assert stats["count"] == len(kept)
+    assert stats["median"] == pytest.approx(np.percentile(kept, 50))
+    assert stats["p90"] == pytest.approx(np.percentile(kept, 90))
+    assert stats["ewma"] == pytest.approx(ewma)
+    assert duration_stats.median_duration(stats) == stats["median"]
+
+
+def test_doctor_without_durations_has_an_empty_summary(database):
+    duration_stats.record_durations("d1", [])
+
+    assert duration_stats.get_stats("d1") == {}
+    assert get_ref("duration_stats/d1").get() is None
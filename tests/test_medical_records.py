@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.routes.medical_records import list_records
+from app.services import async_medical_record_service, medical_record_service
+
+
+def test_records_are_not_read_for_a_doctor_without_access(database, monkeypatch):
+    medical_record_service.create_medical_record("d1", "p1", "Flu", "2025-03-03", [], "Rest", "")
+
+    async def no_read(*args):
+        raise AssertionError("records read before the access check")
+
+    monkeypatch.setattr(async_medical_record_service, "get_patient_records", no_read)
+    with pytest.raises(HTTPException) as denied:
+        asyncio.run(list_records("p1", None, None, doctor_id="d2"))
+
+    assert denied.value.status_code == 403
+
+
+def _pages(limit):
+    async def collect():
+        pages, cursor = [], None
+        while True:
+            records, cursor = await async_medical_record_service.get_patient_records("p1", limit, cursor)
+            pages.append([r["visit_date"] for r in records])
+            if cursor is None:
+                return pages
+    return asyncio.run(collect())
+
+
+def test_record_pages_follow_the_cursor_newest_visit_first(database):
+    dates = ["2025-01-05", "2024-12-31", "2025-03-01", "2025-01-05", "2024-06-10"]
+    for date in dates:
+        medical_record_service.create_medical_record("d1", "p1", "Check", date, [], "", "")
+    medical_record_service.create_medical_record("d1", "p2", "Other", "2025-02-01", [], "", "")
+
+    pages = _pages(2)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == sorted(dates, reverse=True)
+    assert _pages(5) == [sorted(dates, reverse=True)]
+    assert _pages(None) == [sorted(dates, reverse=True)]
+
+
+def test_doctor_listing_returns_the_cursor_for_the_next_page(database):
+    for date in ("2025-01-01", "2025-01-02", "2025-01-03"):
+        medical_record_service.create_medical_record("d1", "p1", "Check", date, [], "", "")
+
+    first = asyncio.run(list_records("p1", 2, None, doctor_id="d1"))
+    second = asyncio.run(list_records("p1", 2, first.next_cursor, doctor_id="d1"))
+
+    assert [r.visit_date for r in first.records] == ["2025-01-03", "2025-01-02"]
+    assert [r.visit_date for r in second.records] == ["2025-01-01"]
+    assert second.next_cursor is None
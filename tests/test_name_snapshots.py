@@ -0,0 +1,29 @@
+from app.core.database import get_ref
+from app.services import medical_record_service, name_snapshots, queue_repository, queue_service
+
+
+def test_fan_out_does_not_recreate_an_archived_entry(database):
+    archived = queue_service.book_token("p1", "d1")["entry"]
+    live = queue_service.book_token("p1", "d2")["entry"]
+    shard = queue_repository.shard_path("d1", archived["date"])
+    # Another worker archives the first entry; this worker's index has not seen it yet
+    database.write(shard.split("/") + [archived["id"]], None)
+    get_ref("patients/p1").update({"name": "Pat Renamed"})
+
+    name_snapshots.fan_out("patients", "p1")
+
+    assert get_ref(f"{shard}/{archived['id']}").get() is None
+    stored = get_ref(f"{queue_repository.shard_path('d2', live['date'])}/{live['id']}").get()
+    assert stored["patient_name"] == "Pat Renamed"
+    assert stored["status"] == live["status"]
+
+
+def test_fan_out_renames_the_doctor_on_records_through_the_index(database):
+    record = medical_record_service.create_medical_record(
+        "d1", "p1", "Flu", "2025-03-03", [], "Rest", "")
+    assert get_ref(f"records_by_doctor/d1/{record['id']}").get() is True
+    get_ref("doctors/d1").update({"name": "Dr Renamed"})
+
+    name_snapshots.fan_out("doctors", "d1")
+
+    assert get_ref(f"medical_records/{record['id']}/doctor_name").get() == "Dr Renamed"
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+from app.core.database import get_ref
+from app.services import medical_record_service, patient_service
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "scripts"))
+import backfill_indexes  # noqa: E402
+
+
+def test_linking_writes_both_adjacency_nodes_once(database):
+    patient_service.link_doctor_to_patient("d1", "p1")
+    patient_service.link_doctor_to_patient("d1", "p1")
+    medical_record_service.create_medical_record("d2", "p1", "Flu", "2025-03-03", [], "Rest", "")
+
+    assert get_ref("doctor_patients").get() == {"d1": {"p1": True}, "d2": {"p1": True}}
+    assert get_ref("patient_doctors").get() == {"p1": {"d1": True, "d2": True}}
+    assert patient_service.has_doctor_access("d2", "p1")
+
+
+def test_doctor_listing_reads_only_the_doctors_own_patients(database):
+    for patient_id in ("p1", "p2"):
+        patient_service.link_doctor_to_patient("d1", patient_id)
+    patient_service.link_doctor_to_patient("d2", "p3")
+    get_ref("patients/p2").update({"is_active": False})
+    reads = database.stats["reads"]
+
+    listed = patient_service.get_all_doctor_patients("d1")
+
+    assert [p["id"] for p in listed] == ["p1"]
+    # The adjacency node, then p1 and p2: nothing of d2's patients or the link table
+    assert database.stats["reads"] - reads == 3
+
+
+def test_backfill_builds_adjacency_from_existing_links(database):
+    get_ref("doctor_patient").set({
+        "d1_p1": {"doctor_id": "d1", "patient_id": "p1"},
+        "d2_p3": {"doctor_id": "d2", "patient_id": "p3"},
+        "broken": {"doctor_id": "d1"},
+    })
+
+    backfill_indexes.backfill_adjacency()
+
+    assert get_ref("doctor_patients").get() == {"d1": {"p1": True}, "d2": {"p3": True}}
+    assert get_ref("patient_doctors").get() == {"p1": {"d1": True}, "p3": {"d2": True}}
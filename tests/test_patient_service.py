@@ -0,0 +1,38 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.services import account_index, patient_service
+
+
+def test_failed_patient_write_releases_the_email_and_phone(database, monkeypatch):
+    def fail(count):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(patient_service, "allocate_patient_numbers", fail)
+    with pytest.raises(RuntimeError):
+        patient_service.create_patient("New", "new@example.com", "+923001112223", "2000-01-01", "Lahore")
+
+    assert account_index.lookup("patients", "email", "new@example.com") is None
+    assert account_index.lookup("patients", "phone", "+923001112223") is None
+    monkeypatch.undo()
+    created = patient_service.create_patient("New", "new@example.com", "+923001112223",
+                                             "2000-01-01", "Lahore")
+    assert account_index.lookup("patients", "email", "new@example.com") == created["id"]
+
+
+def test_patient_numbers_stay_unique_and_increasing_across_transactions(database):
+    database.write(["patients", "legacy"], {"name": "Old", "patient_number": 41})
+    block = patient_service.allocate_patient_numbers(5)
+    context = contextvars.copy_context()
+
+    def register(n):
+        return patient_service.create_patient(f"P{n}", f"p{n}@example.com", f"+9230000{n:05d}",
+                                              "2000-01-01", "Lahore")["patient_number"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        numbers = list(pool.map(lambda n: context.copy().run(register, n), range(12)))
+    later = patient_service.allocate_patient_numbers(1)
+
+    assert list(block) == [42, 43, 44, 45, 46]
+    assert sorted(numbers) == list(range(47, 59))
+    assert list(later) == [59]
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from fastapi.concurrency import run_in_threadpool
+from api.index import app
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.services import queue_repository, queue_service
+from app.services.queue_events import stop_hub
+
+
+async def _open_stream(path: str, token: str):
+    """Start an SSE request on the app; returns (parsed events queue, disconnect, task)."""
+    events: asyncio.Queue = asyncio.Queue()
+    disconnected = asyncio.Event()
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "server": ("test", 80), "client": ("test", 1),
+        "headers": [(b"host", b"test"), (b"authorization", f"Bearer {token}".encode())],
+    }
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] != "http.response.body":
+            return
+        for block in message.get("body", b"").decode().split("\n\n"):
+            for line in block.splitlines():
+                if line.startswith("data: "):
+                    await events.put(json.loads(line[len("data: "):]))
+
+    task = asyncio.create_task(app(scope, receive, send))
+    return events, disconnected, task
+
+
+def test_sse_subscriber_receives_booking_as_changed_diff(database, monkeypatch):
+    # Every shard lookup reloads, so a hub reading through a stale cache would show
+    monkeypatch.setattr(settings, "QUEUE_INDEX_TTL_SECONDS", 0.0)
+
+    async def scenario():
+        token = create_access_token({"sub": "d1"})
+        events, disconnected, task = await _open_stream("/queue/stream?scope=doctor", token)
+        try:
+            snapshot = await asyncio.wait_for(events.get(), 5)
+            assert snapshot["type"] == "snapshot" and snapshot["entries"] == {}
+
+            booked = await run_in_threadpool(queue_service.book_token, "p1", "d1")
+            entry_id = booked["entry"]["id"]
+            message = await asyncio.wait_for(events.get(), 5)
+            # Let the hub run a resync too: it must not drop the new entry
+            await asyncio.sleep(0.1)
+
+            assert message["type"] == "diff"
+            assert entry_id in message.get("changed", {})
+            assert entry_id not in message.get("removed", [])
+            today = queue_service.today_str()
+            assert [e["id"] for e in queue_repository.find_entries(doctor_id="d1", date=today)] \
+                == [entry_id]
+            assert events.empty()
+        finally:
+            disconnected.set()
+            await asyncio.wait_for(task, 5)
+            await stop_hub()
+
+    asyncio.run(scenario())
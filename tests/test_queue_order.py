@@ -0,0 +1,41 @@
+import random
+from app.services import queue_service
+from app.services.queue_order import FenwickTree, QueueOrder
+
+
+def test_count_ahead_matches_a_brute_force_count():
+    rng = random.Random(3)
+    order, keys = QueueOrder(), []
+    for step in range(2000):
+        if keys and rng.random() < 0.35:
+            order.remove(keys.pop(rng.randrange(len(keys))))
+        else:
+            # Tokens past the initial tree size force _grow(); several priority ranks
+            key = (rng.choice((-2, -1, 0, 0, 0, 1)), rng.randint(0, 40 + step // 4))
+            order.add(key)
+            keys.append(key)
+        probe = (rng.choice((-3, -2, -1, 0, 1, 2)), rng.randint(-1, 600))
+        assert order.count_ahead(probe) == sum(1 for k in keys if k < probe)
+        assert len(order) == len(keys)
+
+
+def test_fenwick_tree_keeps_its_sums_when_it_grows():
+    tree = FenwickTree(size=4)
+    counts = {1: 2, 3: 1, 9: 4, 70: 1}
+    for position, count in counts.items():
+        tree.add(position, count)
+
+    for limit in range(0, 80):
+        assert tree.count_below(limit) == sum(c for p, c in counts.items() if p < limit)
+
+
+def test_positions_follow_priority_and_check_in(database):
+    for patient_id in ("p1", "p2", "p3"):
+        queue_service.book_token(patient_id, "d1")
+        queue_service.check_in_patient(patient_id)
+    queue_service.set_priority("p3", "d1", 2)
+
+    entries = [queue_service.get_active_queue_for_patient(p) for p in ("p1", "p2", "p3")]
+    positions = [queue_service.calculate_position(e) for e in entries]
+
+    assert positions == [2, 3, 1]
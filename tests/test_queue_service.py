@@ -0,0 +1,73 @@
+import re
+from app.services import queue_repository, queue_service
+
+
+def test_call_next_skips_entry_archived_by_another_worker(database):
+    first = queue_service.book_token("p1", "d1")["entry"]
+    second = queue_service.book_token("p2", "d1")["entry"]
+    queue_service.check_in_patient("p1")
+    queue_service.check_in_patient("p2")
+    # Another worker cancels the first entry; this worker's index has not seen it yet
+    database.write(queue_repository.shard_path("d1", first["date"]).split("/") + [first["id"]], None)
+
+    called = queue_service.call_next("d1")
+
+    assert called["id"] == second["id"]
+    assert called["status"] == "serving"
+    assert not queue_repository.find_entries(patient_id="p1")
+
+
+def test_bulk_only_changes_bookings_of_the_caller(database):
+    queue_service.book_token("p1", "d1")
+    other = queue_service.book_token("p2", "d2")["entry"]
+
+    results = queue_service.apply_bulk([
+        {"patient_id": "p1", "action": "check_in"},
+        {"patient_id": "p2", "action": "cancel"},
+    ], actor_id="d1")
+
+    assert [r["success"] for r in results] == [True, False]
+    assert results[1]["error"] == "Not allowed to change this booking"
+    assert queue_repository.find_entries(patient_id="p1")[0]["status"] == "waiting"
+    assert queue_repository.find_entries(patient_id="p2")[0]["id"] == other["id"]
+
+    results = queue_service.apply_bulk([{"patient_id": "p2", "action": "cancel"}], actor_id="p2")
+    assert results[0]["success"]
+    archived = database.read(["queue_history", other["date"], other["id"]])
+    assert re.fullmatch(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ", archived["cancelled_at"])
+
+
+def test_check_in_does_not_recreate_an_entry_archived_by_another_worker(database):
+    entry = queue_service.book_token("p1", "d1")["entry"]
+    shard = queue_repository.shard_path("d1", entry["date"])
+    database.write(shard.split("/") + [entry["id"]], None)
+
+    assert queue_service.check_in_patient("p1") is None
+    assert queue_service.set_priority("p1", "d1", 1) is None
+    assert database.read(shard.split("/") + [entry["id"]]) is None
+
+
+def test_shard_reloads_do_not_pile_up_entries_without_queue_fields(database, monkeypatch):
+    monkeypatch.setattr(queue_repository.settings, "QUEUE_INDEX_TTL_SECONDS", 0)
+    entry = queue_service.book_token("p1", "d1")["entry"]
+    shard = queue_repository.shard_path("d1", entry["date"]).split("/")
+    database.write(shard + ["partial"], {"status": "waiting", "check_in_time": "2025-03-03T09:00:00Z"})
+
+    versions = set()
+    for _ in range(5):
+        versions.add(queue_repository.queue_version("d1", entry["date"]))
+    index = queue_repository._index
+
+    assert len(index._entries) == 2
+    assert index._waiting_live.get((None, None)) == 1
+    assert len(versions) == 1
+
+
+def test_patient_lookup_follows_the_pointers_over_a_cached_shard(database):
+    entry = queue_service.book_token("p1", "d1")["entry"]
+    # Another worker archives the entry: shard node and pointer go in one update
+    database.write(queue_repository.shard_path("d1", entry["date"]).split("/") + [entry["id"]], None)
+    database.write(["patient_queue", "p1", entry["id"]], None)
+
+    assert queue_service.get_active_queue_for_patient("p1") is None
+    assert queue_repository.find_patients_entries(["p1"]) == {"p1": []}
@@ -0,0 +1,38 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from app.core.database import get_ref
+from app.services import queue_service
+
+
+def test_parallel_bookings_with_one_doctor_get_distinct_tokens(database):
+    patients = [f"p{i}" for i in range(1, 4)] * 8
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(
+            lambda p: context.copy().run(queue_service.book_token, p, "d1"), patients))
+
+    tokens = sorted(r["entry"]["token_number"] for r in results)
+    assert tokens == list(range(1, len(patients) + 1))
+    today = queue_service.today_str()
+    assert get_ref(f"token_counters/d1/{today}").get() == len(patients)
+
+
+def test_every_booking_path_draws_from_the_same_counter(database):
+    first = queue_service.book_token("p1", "d1")["entry"]
+    multi = queue_service.book_multi_doctor_token("p2", ["d1", "d2"])
+    appointment = queue_service.create_queue_entry(
+        "p3", "d1", datetime(2025, 3, 3, 11, 0, tzinfo=timezone.utc))
+
+    assert first["token_number"] == 1
+    assert [m["token_number"] for m in multi] == [2, 1]
+    assert appointment["token_number"] == 3
+
+
+def test_counter_is_seeded_from_tokens_handed_out_before_it_existed(database):
+    today = queue_service.today_str()
+    queue_service.book_token("p1", "d1")
+    queue_service.book_token("p2", "d1")
+    get_ref(f"token_counters/d1/{today}").delete()
+
+    assert queue_service.book_token("p3", "d1")["entry"]["token_number"] == 3
@@ -0,0 +1,16 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from app.core.database import get_ref
+from app.services import wait_model_training
+
+
+def test_concurrent_publishes_get_distinct_versions(database):
+    get_ref("wait_model/version").set(3)
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        versions = list(pool.map(
+            lambda n: context.copy().run(wait_model_training.publish, {"samples": n}), range(8)))
+
+    assert sorted(versions) == list(range(4, 12))
+    stored = get_ref("wait_model").get()
+    assert stored["table"]["samples"] == versions.index(stored["version"])
@@ -0,0 +1,13 @@
+from datetime import datetime, timezone
+from app.services import wait_predictor
+
+
+def test_prediction_cache_forgets_queues_of_past_days(database):
+    monday = datetime(2025, 3, 3, 10, 0, tzinfo=timezone.utc)
+    tuesday = datetime(2025, 3, 4, 10, 0, tzinfo=timezone.utc)
+    wait_predictor.queue_predictions("d1", monday)
+    wait_predictor.queue_predictions("d2", monday)
+
+    wait_predictor.queue_predictions("d1", tuesday)
+
+    assert set(wait_predictor._cache) == {("d1", "2025-03-04")}